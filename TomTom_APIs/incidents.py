@@ -13,12 +13,20 @@ if not logger.hasHandlers():
     logger.addHandler(console_handler)
     logger.propagate = False
 
+# Projection of the cheap first-tier poll, only what is needed to detect changed incidents and to count them by type
+SUMMARY_FIELDS = '{incidents{properties{id,iconCategory,magnitudeOfDelay,delay,numberOfReports,lastReportTime}}}'
+
+# Maximum number of ids per incidentDetails POST request
+DETAILS_BATCH_SIZE = 100
+
 class TrafficIncidents():
     def __init__(self, API):
         self.BASE_URL = API['BASE_URL']
         self.INCIDENTS_SERVICE = API['SERVICE']
         self.INCIDENTS_VERSION_NUMBER = API['VERSION_NUMBER']
         self.INCIDENTS_ENDPOINT = API['ENDPOINT']
+        self.response_bytes = 0
+        self.summary_state = {}
     logger.info("TrafficIncidents API configuration initialized.")
     
     def get_incidents(self, params):
@@ -26,10 +34,37 @@ class TrafficIncidents():
         try:
             response = requests.get(url, params=params) 
             response.raise_for_status() # Raise http error if it occurred
+            self.response_bytes = len(response.content)
             self.incidents = response.json().get('incidents', [])
             logger.info(f"Fetched {len(self.incidents)} incidents.")
             return self.incidents
         except requests.exceptions.RequestException as e:
             logger.error(f"An error occurred: {e}")
+            self.response_bytes = 0
             self.incidents = []
             return self.incidents
+
+    def get_incident_summaries(self, params):
+        """
+        First tier of a two-tier poll: fetches only the change-detection fields of every incident in the bbox.
+        """
+        return self.get_incidents(dict(params, fields=SUMMARY_FIELDS))
+
+    def get_incident_details(self, params, ids, batch_size=DETAILS_BATCH_SIZE):
+        """
+        Second tier of a two-tier poll: fetches the full projection of the given incident ids,
+        batched through the POST variant of incidentDetails.
+        """
+        url = f"{self.BASE_URL}/{self.INCIDENTS_SERVICE}/{self.INCIDENTS_VERSION_NUMBER}/{self.INCIDENTS_ENDPOINT}"
+        params = {key: value for key, value in params.items() if key != 'bbox'}
+        details = []
+        for i in range(0, len(ids), batch_size):
+            try:
+                response = requests.post(url, params=params, json={'ids': ids[i:i + batch_size]})
+                response.raise_for_status() # Raise http error if it occurred
+                self.response_bytes += len(response.content)
+                details.extend(response.json().get('incidents', []))
+            except requests.exceptions.RequestException as e:
+                logger.error(f"An error occurred: {e}")
+        logger.info(f"Fetched details of {len(details)} of {len(ids)} requested incidents.")
+        return details
@@ -1,15 +1,19 @@
 import os
+import sys
 import json
+import time
+import argparse
+import tempfile
 import logging
 import logging.config
-import time
 from datetime import datetime, timedelta, UTC
+
 import schedule
 
-from dotenv import load_dotenv
+from utils import TrafficIncidentsDB, IncidentsReader, csvReport, Metrics, ResponseArchive, replay, ChangeFeed
 
-from TomTom_APIs import Geocode, TrafficIncidents
-from utils import TrafficIncidentsDB, csvReport
+# Heavy dependencies (pandas, geopandas, matplotlib, contextily, geojson) are only imported by the
+# subcommands that use them, so the poll daemon starts quickly and keeps a small memory footprint.
 
 logging_config = {
     'version': 1,
@@ -51,62 +55,190 @@ logging_config = {
     },
 }
 
-logging.config.dictConfig(logging_config)
 logger = logging.getLogger(__name__)
-logger.debug("Logging is configured.")
 
-load_dotenv()
-API_KEY = os.getenv('TOMTOM_API_KEY')
-BASE_URL = os.getenv('BASE_URL')
+INCIDENTS_FIELDS = '{incidents{type,geometry{type,coordinates},properties{id,iconCategory,magnitudeOfDelay,events{description,code,iconCategory},startTime,endTime,from,to,length,delay,roadNumbers,timeValidity,probabilityOfOccurrence,numberOfReports,lastReportTime,tmc{countryCode,tableNumber,tableVersion,direction,points{location,offset}}}}}'
 
-TRAFFIC_INCIDENTS_API_URLS = json.loads(os.getenv('TRAFFIC_INCIDENTS_API_URLS'))
-GEOCODING_API_URLS = json.loads(os.getenv('GEOCODING_API_URLS'))
 
+def configure_logging():
+    os.makedirs('logs', exist_ok=True)
+    logging.config.dictConfig(logging_config)
+    logger.debug("Logging is configured.")
 
-# Initialize Parameters
-INCIDENTS_params = {
-    'key': API_KEY,
-    'bbox': '',
-    'fields': '{incidents{type,geometry{type,coordinates},properties{id,iconCategory,magnitudeOfDelay,events{description,code,iconCategory},startTime,endTime,from,to,length,delay,roadNumbers,timeValidity,probabilityOfOccurrence,numberOfReports,lastReportTime,tmc{countryCode,tableNumber,tableVersion,direction,points{location,offset}}}}}',
-    'language': 'en-GB',
-    'timeValidityFilter': 'present'
-}
 
-GEOCODING_params = {
-    'key': API_KEY,
-}
+def load_settings():
+    """
+    Reads the API configuration from the environment (and .env).
+    """
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    return {
+        'API_KEY': os.getenv('TOMTOM_API_KEY'),
+        'BASE_URL': os.getenv('BASE_URL'),
+        'METRICS_PORT': os.getenv('METRICS_PORT'),
+        'ARCHIVE_RESPONSES': os.getenv('ARCHIVE_RESPONSES', '').lower() in ('1', 'true', 'yes'),
+        'DB_PARTITION': os.getenv('DB_PARTITION') or None,  # e.g. 'month'
+        'TRAFFIC_INCIDENTS_API_URLS': json.loads(os.getenv('TRAFFIC_INCIDENTS_API_URLS')),
+        'GEOCODING_API_URLS': json.loads(os.getenv('GEOCODING_API_URLS')),
+    }
+
+
+def summary_key(properties):
+    """
+    Change-detection fields of an incident, normalised like the database stores them.
+    """
+    return (
+        properties.get('delay') or 0,
+        properties.get('magnitudeOfDelay', 0),
+        properties.get('lastReportTime'),
+        properties.get('numberOfReports', 0),
+    )
+
+
+def fetch_changed_incidents(IncidentsAPI, INCIDENTS_params, database, metrics):
+    """
+    Two-tier poll: fetches the summaries of every incident, diffs them against the previous poll (or the
+    database after a restart) and requests full details only for new or changed ids.
+    Returns the summaries, the detailed incidents and the ids of unchanged incidents.
+    """
+    with metrics.timer('get_incident_summaries'):
+        summaries = IncidentsAPI.get_incident_summaries(INCIDENTS_params)
+    current = {incident['properties']['id']: summary_key(incident['properties']) for incident in summaries}
+
+    # Incidents unknown to this process are compared with their stored values
+    unknown = [incident_id for incident_id in current if incident_id not in IncidentsAPI.summary_state]
+    known = dict(IncidentsAPI.summary_state)
+    if unknown:
+        known.update(database.get_incident_state(unknown))
+
+    changed_ids = [incident_id for incident_id, key in current.items() if known.get(incident_id) != key]
+    unchanged_ids = [incident_id for incident_id, key in current.items() if known.get(incident_id) == key]
+
+    details = []
+    if changed_ids:
+        with metrics.timer('get_incident_details'):
+            details = IncidentsAPI.get_incident_details(INCIDENTS_params, changed_ids)
 
-def fetch_and_process(INCIDENTS_params, csv_file, database, threshold_minutes=5):
+    # Ids whose details could not be fetched are retried on the next poll
+    fetched = {incident['properties']['id'] for incident in details}.union(unchanged_ids)
+    IncidentsAPI.summary_state = {incident_id: key for incident_id, key in current.items() if incident_id in fetched}
+    logger.info(f"{len(changed_ids)} new or changed incident(s) of {len(current)} current.")
+    return summaries, details, unchanged_ids
+
+
+def fetch_and_process(IncidentsAPI, INCIDENTS_params, csv_file, database, threshold_minutes=5, metrics=None, archive=None,
+                      two_tier=False, live_api=None, changefeed=None, current_time=None):
+    """
+    Runs one poll: fetches the incidents, writes them to the database and publishes the results.
+    current_time stands in for the clock, e.g. when the soak test runs polls at an accelerated pace.
+    """
+    metrics = metrics or Metrics()
+    changelog = [] if changefeed is not None else None
     try:
         logger.info("Starting fetch for incidents.")
         
-        # Fetch incidents
-        IncidentsAPI.get_incidents(INCIDENTS_params)
+        # Fetch incidents, either the full projection or only the new and changed ones
+        if two_tier:
+            incidents, details, unchanged_ids = fetch_changed_incidents(IncidentsAPI, INCIDENTS_params, database, metrics)
+        else:
+            with metrics.timer('get_incidents'):
+                incidents = details = IncidentsAPI.get_incidents(INCIDENTS_params)
+            unchanged_ids = []
+        metrics.inc('bytes_received_total', IncidentsAPI.response_bytes, help="Bytes received from the incidents API.")
+
+        # Keep the raw poll for later replays, two-tier polls do not carry every incident's details
+        if archive is not None and not two_tier and IncidentsAPI.response_bytes:
+            with metrics.timer('archive'):
+                archive.append(incidents, timestamp=current_time)
         
-        if IncidentsAPI.incidents:
+        if incidents:
             
             # Append new incidents to the db and update those that have changed
-            changes, inserts = database.update_incidents(IncidentsAPI.incidents)
+            with metrics.timer('update_incidents'):
+                start = time.perf_counter()
+                changes, inserts = database.update_incidents(details, current_time=current_time, changelog=changelog)
+                elapsed = time.perf_counter() - start
+                if unchanged_ids:
+                    database.touch_incidents(unchanged_ids, current_time=current_time)
+            # Two-tier polls only write the details, unchanged ids just get their last_seen touched
+            metrics.inc('rows_written_total', len(details), help="Incident rows written to the database.")
+            metrics.set_gauge('rows_written_per_second', len(details) / elapsed if elapsed > 0 else 0,
+                              help="Write throughput of the last update_incidents call.")
+            metrics.inc('rows_touched_total', len(unchanged_ids), help="Unchanged incidents whose last_seen was updated.")
 
             # Analysis
-            csv_file.analyse_commit(IncidentsAPI.incidents, changes, inserts) 
+            with metrics.timer('analyse_commit'):
+                csv_file.analyse_commit(incidents, changes, inserts) 
             
             # Mark ended incidents
-            database.mark_ended_incidents(threshold_minutes=threshold_minutes)
+            with metrics.timer('mark_ended_incidents'):
+                database.mark_ended_incidents(threshold_minutes=threshold_minutes, current_time=current_time,
+                                              changelog=changelog)
  
         else:
             logger.info("No incidents found.")
+
+        # Publish the poll's changes to downstream consumers, with those a failed export left in the DB
+        if changefeed is not None:
+            with metrics.timer('changefeed'):
+                exported = changefeed.export(database)
+            metrics.inc('change_events_total', exported, help="Events appended to the change feed.")
+
+        # Serve the new state to the dashboards
+        if live_api is not None:
+            with metrics.timer('live_api_refresh'):
+                live_api.refresh(database)
+
+        metrics.record_db_size(database.db_path)
     
     except Exception as e:
+        metrics.inc('poll_errors_total', help="Polls that raised an exception.")
         logger.error("An error occurred while fetching and processing incidents.", exc_info=True)
 
-if __name__ == "__main__":
-    location = "Singapore"
+def extend_raster(cube, database, metrics):
+    """
+    Burns the incidents since the last run into the delay cube. Errors are logged, they must not stop the poller.
+    """
+    try:
+        with metrics.timer('raster'):
+            cube.append_until(database)
+    except Exception as e:
+        metrics.inc('raster_errors_total', help="Raster updates that raised an exception.")
+        logger.error("An error occurred while extending the delay raster.", exc_info=True)
+
+def record_scheduler_lag(metrics):
+    """
+    Records how late each due job is relative to its scheduled run time.
+    """
+    now = datetime.now()
+    for job in schedule.get_jobs():
+        if job.should_run:
+            metrics.set_gauge('scheduler_lag_seconds', (now - job.next_run).total_seconds(),
+                              help="Delay between a job's scheduled and actual start.", job=job.job_func.__name__)
+
+def poll(args):
+    from TomTom_APIs import Geocode, TrafficIncidents
+
+    settings = load_settings()
+    location = args.location
     dir_path = f"{location}_TrafficIncidents"
     os.makedirs(dir_path, exist_ok=True)
-    
-    Geocode_API = Geocode(GEOCODING_API_URLS)
-    IncidentsAPI = TrafficIncidents(TRAFFIC_INCIDENTS_API_URLS)
+
+    # Initialize Parameters
+    INCIDENTS_params = {
+        'key': settings['API_KEY'],
+        'bbox': '',
+        'fields': INCIDENTS_FIELDS,
+        'language': 'en-GB',
+        'timeValidityFilter': 'present'
+    }
+    GEOCODING_params = {
+        'key': settings['API_KEY'],
+    }
+
+    Geocode_API = Geocode(settings['GEOCODING_API_URLS'])
+    IncidentsAPI = TrafficIncidents(settings['TRAFFIC_INCIDENTS_API_URLS'])
 
     # Get and reformat bounding box
     logger.info("Starting Geocoding.")
@@ -117,21 +249,369 @@ if __name__ == "__main__":
         logger.info(f"Formatted BBox (min_lon,min_lat,max_lon,max_lat): ({reformatted_bbox})")
     else:
         logger.error("Failed to retrieve bounding box.")
-        exit()
+        return 1
     logger.info("TomTom Incident Fetcher Started.")
 
     # Initialize the SQLite DataBase
-    db = TrafficIncidentsDB(dir_path, location=location)
+    db = TrafficIncidentsDB(dir_path, location=location, partition=settings['DB_PARTITION'])
 
     # Initialize the report
     report = csvReport(dir_path)
 
-    fetch_and_process(INCIDENTS_params=INCIDENTS_params, csv_file=report, database=db, threshold_minutes=5)
+    # Initialize the metrics, exposed over HTTP when METRICS_PORT is set
+    metrics = Metrics()
+    if settings['METRICS_PORT']:
+        metrics.serve(int(settings['METRICS_PORT']))
+
+    # Initialize the raw response archive, used to rebuild the DB with the replay command
+    archive = ResponseArchive(os.path.join(dir_path, 'archive')) if settings['ARCHIVE_RESPONSES'] else None
+
+    # Initialize the read API for dashboards, refreshed after each poll
+    live_api = None
+    if args.serve:
+        from utils.live_api import LiveAPI
+
+        live_api = LiveAPI(dir_path=dir_path, location=location)
+        live_api.serve(args.serve)
+
+    # Initialize the change feed of per-poll incident diffs
+    changefeed = ChangeFeed(os.path.join(dir_path, 'changes'), writable=True) if args.change_feed else None
+
+    job_kwargs = dict(IncidentsAPI=IncidentsAPI, INCIDENTS_params=INCIDENTS_params, csv_file=report, database=db,
+                      threshold_minutes=args.threshold_minutes, metrics=metrics, archive=archive, two_tier=args.two_tier,
+                      live_api=live_api, changefeed=changefeed)
+    fetch_and_process(**job_kwargs)
 
     # Schedule fetching and processing of incidents
-    schedule.every(40).seconds.do(fetch_and_process, INCIDENTS_params=INCIDENTS_params, csv_file=report, database=db, threshold_minutes=5)
-    schedule.every(1).day.at('12:30:00').do(db.optimize)
+    schedule.every(args.interval).seconds.do(fetch_and_process, **job_kwargs)
+    schedule.every(1).day.at('12:30:00').do(metrics.timed('optimize', db.optimize))
+
+    # Grow the delay raster cube as polls arrive
+    if args.raster:
+        from utils.raster import DelayCube
+
+        bbox = [float(value) for value in INCIDENTS_params['bbox'].split(',')]
+        cube = DelayCube(os.path.join(dir_path, 'delay_cube'), bbox=bbox, t0=datetime.now(UTC))
+        schedule.every(int(cube.step.total_seconds())).seconds.do(extend_raster, cube=cube, database=db, metrics=metrics)
 
     while True:
+        record_scheduler_lag(metrics)
         schedule.run_pending()
-        time.sleep(1)
\ No newline at end of file
+        time.sleep(1)
+
+
+def open_reader(args):
+    dir_path = args.dir or f"{args.location}_TrafficIncidents"
+    return IncidentsReader(dir_path=dir_path, db_path=args.db, location=args.location)
+
+
+def export(args):
+    db = open_reader(args)
+    db.export_to_geojson(args.start, args.end, args.output, detail=args.detail)
+    db.close()
+
+
+def report(args):
+    from utils.report_plots import plot_reports
+
+    db = open_reader(args)
+    plot_reports(db, args.start, args.end, args.output or db.dir_path, show=args.show)
+    db.close()
+
+
+def animate(args):
+    from utils.animation import render_frames, encode_video
+
+    render_frames(args.geojson, args.basemap, args.anim_dir, args.start, args.end,
+                  step_size=timedelta(minutes=args.step_minutes), window=timedelta(minutes=args.window_minutes))
+    if not args.frames_only:
+        encode_video(args.anim_dir, ffmpeg_path=args.ffmpeg, framerate=args.framerate)
+
+
+def cams(args):
+    import SingaporeTrafficCamsAPI
+
+    SingaporeTrafficCamsAPI.main()
+
+
+def maintain(args):
+    dir_path = args.dir or f"{args.location}_TrafficIncidents"
+    # Opening the writer runs the schema checks and a VACUUM of the current partition
+    db = TrafficIncidentsDB(dir_path=dir_path, db_path=args.db, location=args.location, partition=args.partition)
+    db.backfill_levels_of_detail()
+    db.backfill_roads()
+    db.backfill_closed_partitions()
+    db.conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    db.conn.close()
+
+
+def hotspots(args):
+    from utils.hotspots import HotspotGrid, state_path
+
+    bbox = [float(value) for value in args.bbox.split(',')]
+    if args.state and os.path.exists(state_path(args.state)):
+        grid = HotspotGrid.load(args.state)
+    else:
+        grid = HotspotGrid(bbox, cell_size=args.cell_size, bin_minutes=args.bin_minutes, timezone=args.timezone)
+
+    db = open_reader(args)
+    grid.update(db)
+    db.close()
+    if args.state:
+        grid.save(args.state)
+
+    for rank, hotspot in enumerate(grid.hotspots(min_occurrences=args.min_occurrences, top=args.top), 1):
+        lon, lat = hotspot['centroid']
+        print(f"{rank:>3}. ({lat:.5f}, {lon:.5f}) {hotspot['cells']} cell(s), {hotspot['occurrences']} occurrence(s), "
+              f"total delay {hotspot['total_delay']:.0f}s, mean {hotspot['mean_delay']:.0f}s, "
+              f"{', '.join(hotspot['time_bins'])}")
+
+
+def roads(args):
+    db = open_reader(args)
+    stats = db.road_stats(args.start, args.end, roads=args.road)
+    db.close()
+    ranked = sorted(stats.items(), key=lambda item: item[1][args.sort], reverse=True)
+    for road, totals in ranked[:args.top]:
+        print(f"{road:>10}: {totals['incidents']} incident(s), total delay {totals['delay']:.0f}s, "
+              f"total duration {totals['duration'] / 3600:.1f}h")
+
+
+def raster(args):
+    from utils.raster import DelayCube
+
+    dir_path = args.dir or f"{args.location}_TrafficIncidents"
+    path = args.output or os.path.join(dir_path, 'delay_cube')
+    bbox = [float(value) for value in args.bbox.split(',')] if args.bbox else None
+    if not os.path.exists(f"{path}.json") and (bbox is None or args.start is None):
+        logger.error(f"No delay cube at {path} yet, --bbox and --start are needed to create it")
+        return 1
+    cube = DelayCube(path, bbox=bbox, cell_size=args.cell_size, t0=args.start,
+                     step=timedelta(minutes=args.step_minutes), weight=args.weight)
+    db = open_reader(args)
+    cube.append_until(db, until=args.end)
+    db.close()
+
+
+def changes(args):
+    dir_path = args.dir or f"{args.location}_TrafficIncidents"
+    feed = ChangeFeed(args.feed or os.path.join(dir_path, 'changes'))
+    after = args.after if args.after is not None else feed.get_cursor(args.consumer) if args.consumer else 0
+    last = after
+    try:
+        for event in feed.read(after=after, limit=args.limit):
+            print(json.dumps(event))
+            last = event['seq']
+    except LookupError as e:
+        logger.error(f"{e}, resync from the database and restart with --after set past them")
+        return 1
+    if args.consumer and last > after:
+        feed.set_cursor(args.consumer, last)
+
+
+def soak(args):
+    from TomTom_APIs import TrafficIncidents
+    from utils.fake_server import SimulatedIncidents, FakeIncidentsServer
+    from utils.soak import run_soak
+
+    dir_path = args.dir or tempfile.mkdtemp(prefix='tomtom_soak_')
+    os.makedirs(dir_path, exist_ok=True)
+    world = SimulatedIncidents(active=args.active, seed=args.seed, start_time=datetime.now(UTC))
+    server = FakeIncidentsServer(world).start()
+
+    IncidentsAPI = TrafficIncidents(server.api)
+    INCIDENTS_params = {
+        'key': 'soak',
+        'bbox': ','.join(str(value) for value in world.bbox),
+        'fields': INCIDENTS_FIELDS,
+        'language': 'en-GB',
+        'timeValidityFilter': 'present'
+    }
+    db = TrafficIncidentsDB(dir_path, location=args.location, partition=args.partition)
+    archive = ResponseArchive(os.path.join(dir_path, 'archive')) if args.archive else None
+    changefeed = ChangeFeed(os.path.join(dir_path, 'changes'), writable=True) if args.change_feed else None
+    job_kwargs = dict(IncidentsAPI=IncidentsAPI, INCIDENTS_params=INCIDENTS_params, csv_file=csvReport(dir_path),
+                      database=db, threshold_minutes=args.threshold_minutes, metrics=Metrics(), archive=archive,
+                      two_tier=args.two_tier, changefeed=changefeed)
+
+    # Per-poll logs would dominate the run, only warnings and the soak progress are kept
+    for name in list(logging.root.manager.loggerDict) + [__name__]:
+        if name != 'utils.soak':
+            logging.getLogger(name).setLevel(logging.WARNING)
+
+    last_day = [world.now.date()]
+
+    def poll_once(current_time):
+        fetch_and_process(**job_kwargs, current_time=current_time)
+        # Daily VACUUM, as scheduled by the poll command
+        if current_time.date() != last_day[0]:
+            last_day[0] = current_time.date()
+            db.optimize()
+
+    try:
+        report = run_soak(poll_once, world, db, days=args.days, interval=args.interval,
+                          sample_minutes=args.sample_minutes, warmup_days=args.warmup_days,
+                          max_memory_slope=args.max_memory_slope, max_latency_growth=args.max_latency_growth,
+                          output_dir=dir_path, trace_memory=not args.no_tracemalloc)
+    finally:
+        server.stop()
+        db.conn.close()
+
+    print(f"{report['polls']} polls over {args.days} simulated day(s) in {report['wall_seconds']:.0f}s, "
+          f"samples in {os.path.join(dir_path, 'soak.csv')}")
+    print(f"traced memory {report['traced_slope_mb_per_day']:+.3f} MB/day, RSS {report['rss_slope_mb_per_day']:+.3f} MB/day, "
+          f"p50 latency {report['latency_p50_ms']:.1f} ms ({report['latency_growth_per_day']:+.2%}/day), "
+          f"DB {report['db_slope_mb_per_day']:+.2f} MB/day")
+    if report['top_growth']:
+        print("Largest allocation growth after the warmup:")
+        for line in report['top_growth']:
+            print(f"  {line}")
+    for failure in report['failures']:
+        print(f"FAIL: {failure}")
+    return 0 if report['passed'] else 1
+
+
+def replay_archive(args):
+    dir_path = args.dir or f"{args.location}_TrafficIncidents"
+    archive = ResponseArchive(args.archive or os.path.join(dir_path, 'archive'))
+    db = TrafficIncidentsDB(db_path=args.db, location=args.location, partition=args.partition)
+    replay(archive, db, threshold_minutes=args.threshold_minutes, start=args.start, end=args.end)
+    db.close()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='tomtom', description="TomTom traffic incident fetcher and reports.")
+    parser.add_argument('--location', default="Singapore")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    def add_db_arguments(subparser):
+        subparser.add_argument('--dir', help="Data directory (default: <location>_TrafficIncidents)")
+        subparser.add_argument('--db', help="Database file (default: <dir>/<location>_Incidents.db)")
+
+    def add_window_arguments(subparser, required=True):
+        subparser.add_argument('--start', type=datetime.fromisoformat, required=required, help="ISO start timestamp")
+        subparser.add_argument('--end', type=datetime.fromisoformat, required=required, help="ISO end timestamp")
+
+    sub = subparsers.add_parser('poll', help="Run the incident fetcher daemon")
+    sub.add_argument('--interval', type=int, default=40, help="Seconds between polls")
+    sub.add_argument('--threshold-minutes', type=int, default=5)
+    sub.add_argument('--two-tier', action='store_true',
+                     help="Poll change-detection fields only and fetch details of new or changed incidents")
+    sub.add_argument('--raster', action='store_true', help="Extend <dir>/delay_cube every step as polls arrive")
+    sub.add_argument('--serve', type=int, metavar='PORT', help="Serve live incidents and rollups over HTTP on PORT")
+    sub.add_argument('--change-feed', action='store_true', help="Record insert, update and end events in <dir>/changes")
+    sub.set_defaults(func=poll)
+
+    sub = subparsers.add_parser('export', help="Export incidents to GeoJSON")
+    add_db_arguments(sub)
+    add_window_arguments(sub)
+    sub.add_argument('--output', required=True, help="GeoJSON output file")
+    sub.add_argument('--detail', type=int, choices=[0, 1, 2, 3], default=0,
+                     help="Geometry level of detail, 0 is full precision and 3 the coarsest (city-wide animations)")
+    sub.set_defaults(func=export)
+
+    sub = subparsers.add_parser('report', help="Plot cause share and delay metrics")
+    add_db_arguments(sub)
+    add_window_arguments(sub)
+    sub.add_argument('--output', help="Figures directory (default: data directory)")
+    sub.add_argument('--show', action='store_true', help="Display the figures")
+    sub.set_defaults(func=report)
+
+    sub = subparsers.add_parser('animate', help="Render the delay animation from a GeoJSON export")
+    add_window_arguments(sub)
+    sub.add_argument('--geojson', required=True)
+    sub.add_argument('--basemap', required=True, help="Pre-downloaded basemap raster")
+    sub.add_argument('--anim-dir', default='anim')
+    sub.add_argument('--step-minutes', type=int, default=10)
+    sub.add_argument('--window-minutes', type=int, default=60)
+    sub.add_argument('--framerate', type=int, default=12)
+    sub.add_argument('--ffmpeg', default='ffmpeg', help="Path to the ffmpeg executable")
+    sub.add_argument('--frames-only', action='store_true', help="Only render the PNG frames")
+    sub.set_defaults(func=animate)
+
+    sub = subparsers.add_parser('cams', help="Run the Singapore traffic cameras fetcher")
+    sub.set_defaults(func=cams)
+
+    sub = subparsers.add_parser('maintain', help="Run schema checks, VACUUM, side table backfills and WAL checkpoint")
+    add_db_arguments(sub)
+    sub.add_argument('--partition', choices=['day', 'week', 'month', 'year'])
+    sub.set_defaults(func=maintain)
+
+    sub = subparsers.add_parser('hotspots', help="Rank recurring spatio-temporal incident hotspots")
+    add_db_arguments(sub)
+    sub.add_argument('--bbox', required=True, help="min_lon,min_lat,max_lon,max_lat")
+    sub.add_argument('--cell-size', type=float, default=0.005, help="Grid cell size in degrees")
+    sub.add_argument('--bin-minutes', type=int, default=60, help="Time-of-week bin size")
+    sub.add_argument('--timezone', default='Asia/Singapore', help="Timezone of the time-of-week bins")
+    sub.add_argument('--min-occurrences', type=int, default=5)
+    sub.add_argument('--top', type=int, default=20)
+    sub.add_argument('--state', help="File keeping the aggregates between runs for incremental updates")
+    sub.set_defaults(func=hotspots)
+
+    sub = subparsers.add_parser('roads', help="Per-road incident count, delay and duration over a window")
+    add_db_arguments(sub)
+    add_window_arguments(sub)
+    sub.add_argument('--road', action='append', help="Road number to report (repeatable, default: all roads)")
+    sub.add_argument('--sort', choices=['incidents', 'delay', 'duration'], default='delay')
+    sub.add_argument('--top', type=int, default=20)
+    sub.set_defaults(func=roads)
+
+    sub = subparsers.add_parser('raster', help="Create or extend the memory-mapped delay raster cube")
+    add_db_arguments(sub)
+    add_window_arguments(sub, required=False)
+    sub.add_argument('--output', help="Cube path without extension (default: <dir>/delay_cube)")
+    sub.add_argument('--bbox', help="min_lon,min_lat,max_lon,max_lat, needed to create the cube")
+    sub.add_argument('--cell-size', type=float, default=0.002, help="Grid cell size in degrees")
+    sub.add_argument('--step-minutes', type=int, default=10)
+    sub.add_argument('--weight', choices=['delay', 'magnitudeOfDelay'], default='delay')
+    sub.set_defaults(func=raster)
+
+    sub = subparsers.add_parser('changes', help="Print change feed events as NDJSON, resuming from a cursor")
+    sub.add_argument('--dir', help="Data directory (default: <location>_TrafficIncidents)")
+    sub.add_argument('--feed', help="Change feed directory (default: <dir>/changes)")
+    sub.add_argument('--consumer', help="Name of the stored cursor to resume from and advance")
+    sub.add_argument('--after', type=int, help="Print the events after this seq (overrides the stored cursor)")
+    sub.add_argument('--limit', type=int, help="Maximum number of events to print")
+    sub.set_defaults(func=changes)
+
+    sub = subparsers.add_parser('soak', help="Run the poll loop against a local fake API at an accelerated clock "
+                                             "and fail on memory or latency drift")
+    sub.add_argument('--dir', help="Soak data directory (default: a new temporary directory)")
+    sub.add_argument('--days', type=float, default=14, help="Simulated days to run")
+    sub.add_argument('--interval', type=int, default=40, help="Simulated seconds between polls")
+    sub.add_argument('--active', type=int, default=200, help="Incidents active at any time in the fake API")
+    sub.add_argument('--seed', type=int, default=0)
+    sub.add_argument('--threshold-minutes', type=int, default=5)
+    sub.add_argument('--partition', choices=['day', 'week', 'month', 'year'])
+    sub.add_argument('--two-tier', action='store_true')
+    sub.add_argument('--archive', action='store_true', help="Archive the raw polls as well")
+    sub.add_argument('--change-feed', action='store_true', help="Record the change feed as well")
+    sub.add_argument('--no-tracemalloc', action='store_true',
+                     help="Only check RSS, tracing Python allocations makes polls several times slower")
+    sub.add_argument('--sample-minutes', type=int, default=60, help="Simulated minutes between samples")
+    sub.add_argument('--warmup-days', type=float, default=1, help="Simulated days left out of the trend fits")
+    sub.add_argument('--max-memory-slope', type=float, default=1.0, help="Allowed memory growth in MB per day")
+    sub.add_argument('--max-latency-growth', type=float, default=0.02,
+                     help="Allowed p50 poll latency growth per day, as a fraction of its level")
+    sub.set_defaults(func=soak)
+
+    sub = subparsers.add_parser('replay', help="Rebuild a database from the raw response archive")
+    add_window_arguments(sub, required=False)
+    sub.add_argument('--dir', help="Data directory (default: <location>_TrafficIncidents)")
+    sub.add_argument('--archive', help="Archive directory (default: <dir>/archive)")
+    sub.add_argument('--db', required=True, help="Database to rebuild into, should not be the live database")
+    sub.add_argument('--partition', choices=['day', 'week', 'month', 'year'])
+    sub.add_argument('--threshold-minutes', type=int, default=5)
+    sub.set_defaults(func=replay_archive)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    configure_logging()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
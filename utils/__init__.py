@@ -1,2 +1,6 @@
 from .incidents_database import TrafficIncidentsDB
-from .reportWriter import csvReport
\ No newline at end of file
+from .reportWriter import csvReport
+from .metrics import Metrics
+from .archive import ResponseArchive, replay
+from .incidents_reader import IncidentsReader
+from .changefeed import ChangeFeed
\ No newline at end of file
@@ -0,0 +1,143 @@
+import os
+import shutil
+import logging
+import subprocess
+from datetime import datetime, timedelta
+
+# Define logger for module
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)  # Default logging level
+
+# If  logger has no handlers add console handler
+if not logger.hasHandlers():
+    console_handler = logging.StreamHandler()
+    formatter = logging.Formatter('%(asctime)s [%(levelname)s] %(filename)s - %(message)s')
+    console_handler.setFormatter(formatter)
+    logger.addHandler(console_handler)
+    logger.propagate = False
+
+
+def filter_events_within_interval(gdf, min_time, max_time):
+    # Convert 'startTime' and 'endTime' columns to datetime objects
+    gdf['startTime'] = gdf['startTime'].apply(lambda x: datetime.fromisoformat(str(x)))
+    gdf['endTime'] = gdf['endTime'].apply(lambda x: datetime.fromisoformat(str(x)) if x else None)
+
+    # Filter incidents that are active within the time interval
+    filtered_gdf = gdf[
+        ((gdf['startTime'] <= max_time) & (gdf['endTime'] >= min_time)) |
+        ((gdf['startTime'] <= max_time) & (gdf['endTime'].isnull()))
+    ]
+    return filtered_gdf
+
+
+def plot_events_within_interval(gdf, min_time, max_time, tmz, delay_min, delay_max, basemap, crs):
+    import matplotlib.pyplot as plt
+    import contextily as ctx
+    from mpl_toolkits.axes_grid1 import make_axes_locatable
+
+    # Filter incidents within the time interval
+    filtered_gdf = filter_events_within_interval(gdf, min_time, max_time)
+
+    # Create the fig (necessary for axes lcoation)
+    fig, ax = plt.subplots(1, 1)
+    divider = make_axes_locatable(ax)
+
+    # Use divider to force legend to be same size as map
+    cax = divider.append_axes("bottom", size="5%", pad=0.1)
+
+    # Plot the filtered incidents
+    filtered_gdf.plot(ax=ax,
+                      cax=cax,
+                      column='delay',
+                      legend=True,
+                      legend_kwds={"label": f"Delay caused by incidents at {min_time.astimezone(tmz).strftime('%d %b %y %H:%M')}",
+                                   "orientation": "horizontal"},
+                      cmap='plasma',
+                      vmin=delay_min,
+                      vmax=delay_max)
+
+    # Hide axes
+    ax.axis("off")
+
+    # Set plot limits (for consistency in-between frames)
+    ax.set_xlim(gdf.total_bounds[0], gdf.total_bounds[2])
+    ax.set_ylim(gdf.total_bounds[1], gdf.total_bounds[3])
+
+    # Add basemap to the figure
+    ctx.add_basemap(ax, crs=crs, source=basemap)
+
+
+def render_frames(geojson_file, basemap_file, anim_dir, min_time, max_time, step_size=timedelta(minutes=10),
+                  window=timedelta(hours=1)):
+    """
+    Renders one PNG per step_size between min_time and max_time into anim_dir/temp, resuming after the last
+    frame already rendered. Returns the frames directory.
+    """
+    import geopandas as gpd
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    if not os.path.exists(basemap_file):
+        raise FileNotFoundError(f"Basemap file {basemap_file} does not exist, download it first (see animate.ipynb).")
+
+    # Load the GeoJSON file into a GeoDataFrame
+    gdf = gpd.read_file(geojson_file)
+
+    # Create a temporary directory in animation directory to store frames
+    temp_dir = os.path.join(anim_dir, 'temp')
+    os.makedirs(temp_dir, exist_ok=True)
+
+    # Get the min and max delays to fix legend range
+    delay_min = gdf['delay'].min()
+    delay_max = gdf['delay'].max()
+
+    # Check coordinate reference system for displaying of points on basemap
+    crs = gdf.crs.to_string()
+
+    # Load the timezone information
+    tmz = min_time.astimezone().tzinfo
+
+    # Calculate total frames and resume after the existing ones
+    frames = int((max_time - min_time) / step_size)
+    existing_frames = sorted(int(f.split('plot')[1].split('.png')[0]) for f in os.listdir(temp_dir)
+                             if f.startswith('plot') and f.endswith('.png'))
+    last_frame = existing_frames[-1] if existing_frames else 0
+
+    for i in range(last_frame, frames):
+        current_time = min_time + i * step_size
+        plot_events_within_interval(gdf, current_time, current_time + window, tmz, delay_min, delay_max, basemap_file, crs)
+
+        # Save the current frame as a PNG image
+        plt.savefig(os.path.join(temp_dir, f"plot{i}.png"))
+        plt.close()
+        logger.debug(f"Rendered frame {i + 1}/{frames}")
+
+    logger.info(f"Rendered {frames - last_frame} frame(s) into {temp_dir}")
+    return temp_dir
+
+
+def encode_video(anim_dir, ffmpeg_path='ffmpeg', framerate=12, keep_frames=False):
+    """
+    Encodes the rendered frames into anim_dir/animation.mp4 (or the next free animation_N.mp4) with ffmpeg.
+    """
+    temp_dir = os.path.join(anim_dir, 'temp')
+
+    # Pattern for ffmpeg to identify frame images, based on render_frames pattern
+    input_pattern = os.path.join(temp_dir, "plot%d.png")
+
+    # Output video file path
+    output_file = os.path.join(anim_dir, "animation.mp4")
+    counter = 1
+    base_output_file = output_file
+    while os.path.exists(output_file):
+        output_file = base_output_file.replace(".mp4", f"_{counter}.mp4")
+        counter += 1
+
+    subprocess.run([ffmpeg_path, '-hide_banner', '-loglevel', 'error', '-framerate', str(framerate),
+                    '-i', input_pattern, '-c:v', 'libx264', '-pix_fmt', 'yuv420p', output_file], check=True)
+    logger.info(f"Animation saved to {output_file}")
+
+    if not keep_frames:
+        shutil.rmtree(temp_dir)
+    return output_file
@@ -0,0 +1,157 @@
+import os
+import gzip
+import json
+import logging
+from datetime import datetime, UTC
+
+from .incidents_database import to_datetime
+
+# Define logger for module
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)  # Default logging level
+
+# If  logger has no handlers add console handler
+if not logger.hasHandlers():
+    console_handler = logging.StreamHandler()
+    formatter = logging.Formatter('%(asctime)s [%(levelname)s] %(filename)s - %(message)s')
+    console_handler.setFormatter(formatter)
+    logger.addHandler(console_handler)
+    logger.propagate = False
+
+
+class ResponseArchive:
+    """
+    Append-only archive of raw incident polls.
+
+    Each day is stored as incidents_YYYY-MM-DD.gz, a concatenation of independent gzip frames (one per poll),
+    with a tab separated incidents_YYYY-MM-DD.idx index of timestamp, offset, length and frame kind.
+    A 'full' frame holds every incident of the poll, a 'delta' frame only the incidents that were added or
+    changed and the ids that disappeared since the previous poll. Every file starts with a full frame and a new
+    one is written every keyframe_interval polls, so any point can be decoded without reading the whole day.
+    """
+    def __init__(self, dir_path, keyframe_interval=90, compresslevel=6):
+        self.dir_path = dir_path
+        self.keyframe_interval = keyframe_interval
+        self.compresslevel = compresslevel
+        self.previous = None
+        self.previous_day = None
+        self.frames_since_keyframe = 0
+        os.makedirs(self.dir_path, exist_ok=True)
+        logger.info(f"Response archive initialised in {self.dir_path}")
+
+    def _paths(self, day):
+        base = os.path.join(self.dir_path, f"incidents_{day}")
+        return f"{base}.gz", f"{base}.idx"
+
+    def append(self, incidents, timestamp=None):
+        """
+        Appends the incidents of one poll, delta-compressed against the previous poll.
+        """
+        # Day files are named in UTC whatever timezone the poll time comes in
+        timestamp = to_datetime(timestamp).astimezone(UTC) if timestamp else datetime.now(UTC)
+        day = timestamp.strftime('%Y-%m-%d')
+        current = {incident['properties']['id']: incident for incident in incidents}
+
+        if (self.previous is None or day != self.previous_day
+                or self.frames_since_keyframe >= self.keyframe_interval):
+            kind = 'full'
+            frame = {'incidents': incidents}
+            self.frames_since_keyframe = 0
+        else:
+            kind = 'delta'
+            frame = {
+                'upserts': [incident for incident_id, incident in current.items()
+                            if self.previous.get(incident_id) != incident],
+                'removed': [incident_id for incident_id in self.previous if incident_id not in current],
+            }
+            self.frames_since_keyframe += 1
+
+        data_path, index_path = self._paths(day)
+        payload = gzip.compress(json.dumps(frame, separators=(',', ':')).encode(), compresslevel=self.compresslevel)
+        try:
+            with open(data_path, 'ab') as f:
+                offset = f.tell()
+                f.write(payload)
+            with open(index_path, 'a') as f:
+                f.write(f"{timestamp.isoformat()}\t{offset}\t{len(payload)}\t{kind}\n")
+        except OSError as e:
+            logger.error(f"Error archiving poll to {data_path}: {e}", exc_info=True)
+            # Force a keyframe on the next poll, the delta chain is broken
+            self.previous = None
+            return
+
+        self.previous = current
+        self.previous_day = day
+        logger.debug(f"Archived {kind} frame of {len(incidents)} incident(s) ({len(payload)} bytes).")
+
+    def _read_index(self, index_path):
+        with open(index_path) as f:
+            for line in f:
+                timestamp, offset, length, kind = line.rstrip('\n').split('\t')
+                yield datetime.fromisoformat(timestamp), int(offset), int(length), kind
+
+    def iter_polls(self, start=None, end=None):
+        """
+        Yields (timestamp, incidents) for every archived poll between start and end, in order.
+        Naive start and end are taken as UTC, like the archived timestamps.
+        """
+        start = to_datetime(start).astimezone(UTC) if start else None
+        end = to_datetime(end).astimezone(UTC) if end else None
+        days = sorted(name[len('incidents_'):-len('.idx')] for name in os.listdir(self.dir_path)
+                      if name.startswith('incidents_') and name.endswith('.idx'))
+        for day in days:
+            if start and day < start.strftime('%Y-%m-%d'):
+                continue
+            if end and day > end.strftime('%Y-%m-%d'):
+                break
+            data_path, index_path = self._paths(day)
+            entries = list(self._read_index(index_path))
+
+            # Begin decoding at the last keyframe before start
+            first = 0
+            if start:
+                for i, (timestamp, _, _, kind) in enumerate(entries):
+                    if timestamp > start:
+                        break
+                    if kind == 'full':
+                        first = i
+
+            state = None
+            with open(data_path, 'rb') as f:
+                for timestamp, offset, length, kind in entries[first:]:
+                    if end and timestamp > end:
+                        return
+                    f.seek(offset)
+                    frame = json.loads(gzip.decompress(f.read(length)))
+                    if kind == 'full':
+                        state = {incident['properties']['id']: incident for incident in frame['incidents']}
+                    elif state is None:
+                        logger.warning(f"Skipping delta frame at {timestamp.isoformat()} without a preceding keyframe.")
+                        continue
+                    else:
+                        for incident_id in frame['removed']:
+                            state.pop(incident_id, None)
+                        for incident in frame['upserts']:
+                            state[incident['properties']['id']] = incident
+                    if start and timestamp < start:
+                        continue
+                    yield timestamp, list(state.values())
+
+
+def replay(archive, database, threshold_minutes=5, start=None, end=None):
+    """
+    Pushes archived polls through the ingest pipeline using their original timestamps.
+    """
+    polls = 0
+    try:
+        for timestamp, incidents in archive.iter_polls(start=start, end=end):
+            # Partition rollovers replace the connection, the pragma is set on the current one
+            database.conn.execute('PRAGMA synchronous = OFF')
+            if incidents:
+                database.update_incidents(incidents, current_time=timestamp)
+            database.mark_ended_incidents(threshold_minutes=threshold_minutes, current_time=timestamp)
+            polls += 1
+    finally:
+        database.conn.execute('PRAGMA synchronous = FULL')
+    logger.info(f"Replayed {polls} archived poll(s) into {database.db_path}")
+    return polls
@@ -0,0 +1,189 @@
+import os
+import json
+import time
+import logging
+from datetime import timedelta
+
+# Define logger for module
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)  # Default logging level
+
+# If  logger has no handlers add console handler
+if not logger.hasHandlers():
+    console_handler = logging.StreamHandler()
+    formatter = logging.Formatter('%(asctime)s [%(levelname)s] %(filename)s - %(message)s')
+    console_handler.setFormatter(formatter)
+    logger.addHandler(console_handler)
+    logger.propagate = False
+
+
+class ChangeFeed:
+    """
+    Append-only feed of incident changes, so downstream consumers sync in O(changes) instead of re-scanning the DB.
+
+    Each line of a segment is a JSON event {"seq", "time", "op", "id", "fields"}: op is 'insert' (fields holds every
+    stored column), 'update' (the columns that changed) or 'end' (the endTime), and time is the poll it came from.
+    Sequence numbers increase by one across segments changes_<first seq>.ndjson. A new segment is started once
+    segment_events is reached, and segments not written to for retention are deleted. Consumers read the events
+    after a cursor (the last seq they processed), which they can keep in cursors.json by name.
+
+    The database logs the events in the transaction of the changes (its changelog table) and export() copies them
+    here, so a crash between the two only delays events to the next export. Only the poller opens the feed with
+    writable=True, which drops a partial event left by an interrupted append. Readers never modify the segments
+    and skip an event still being written.
+    """
+    def __init__(self, dir_path, segment_events=50000, retention=timedelta(days=7), writable=False):
+        self.dir_path = dir_path
+        self.segment_events = segment_events
+        self.retention = retention
+        self.writable = writable
+        self.cursors_path = os.path.join(dir_path, 'cursors.json')
+        os.makedirs(self.dir_path, exist_ok=True)
+
+        self.next_seq = 1
+        self.segment_count = 0
+        if self.writable:
+            segments = self.segments()
+            if segments:
+                first_seq, path = segments[-1]
+                self.segment_count = self._recover(path)
+                self.next_seq = first_seq + self.segment_count
+            logger.info(f"Change feed initialised in {self.dir_path} at seq {self.next_seq}")
+
+    def _path(self, first_seq):
+        return os.path.join(self.dir_path, f"changes_{first_seq:012d}.ndjson")
+
+    def _recover(self, path):
+        """
+        Drops a partial last line left by an interrupted append and returns the number of events in path.
+        """
+        with open(path, 'rb+') as f:
+            data = f.read()
+            if data and not data.endswith(b'\n'):
+                f.truncate(data.rfind(b'\n') + 1)
+                logger.warning(f"Dropped a partial event at the end of {path}")
+        return data.count(b'\n')
+
+    def segments(self):
+        """
+        (first seq, path) of every segment, in order.
+        """
+        names = sorted(name for name in os.listdir(self.dir_path)
+                       if name.startswith('changes_') and name.endswith('.ndjson'))
+        return [(int(name[len('changes_'):-len('.ndjson')]), os.path.join(self.dir_path, name)) for name in names]
+
+    def export(self, db):
+        """
+        Appends the events db (a TrafficIncidentsDB) logged since the last export, with the seq db gave them, and
+        deletes them from db. Returns the number of events appended.
+        """
+        last = self.next_seq - 1
+        events = db.get_changelog()
+        # Logged events are only kept up to the last seq when an export stopped before deleting them, otherwise
+        # a new database or partition numbered them from 1 and they continue the feed instead
+        if events and events[0]['seq'] <= last and self.last_event() not in events:
+            db.renumber_changelog(after=last)
+            events = db.get_changelog()
+        events = [event for event in events if event['seq'] > last]
+        self.append(events)
+        db.prune_changelog(self.next_seq - 1)
+        return len(events)
+
+    def last_event(self):
+        """
+        Last complete event of the feed, None if it is empty.
+        """
+        segments = self.segments()
+        if not segments:
+            return None
+        with open(segments[-1][1], 'rb') as f:
+            lines = [line for line in f.read().split(b'\n')[:-1] if line]
+        return json.loads(lines[-1]) if lines else None
+
+    def append(self, events):
+        """
+        Appends events already numbered in order after the last one, and returns the seq of the last one.
+        """
+        if not self.writable:
+            raise PermissionError(f"Change feed {self.dir_path} was opened read-only")
+        if not events:
+            return self.next_seq - 1
+        first_seq = events[0]['seq']
+        if first_seq < self.next_seq:
+            raise ValueError(f"Change event {first_seq} is already in the feed, next is {self.next_seq}")
+        if first_seq > self.next_seq:
+            # Readers find the gap and resync, the events after it go to a segment of their own
+            logger.warning(f"Change events {self.next_seq} to {first_seq - 1} are missing from the feed")
+            self.segment_count = self.segment_events
+            self.next_seq = first_seq
+        if self.segment_count >= self.segment_events:
+            self.segment_count = 0
+            self.prune()
+        path = self._path(self.next_seq - self.segment_count)
+
+        lines = [json.dumps(event, separators=(',', ':')) for event in events]
+        with open(path, 'a') as f:
+            f.write('\n'.join(lines) + '\n')
+        self.next_seq = events[-1]['seq'] + 1
+        self.segment_count += len(events)
+        logger.debug(f"Appended {len(events)} change event(s) to {path}")
+        return self.next_seq - 1
+
+    def read(self, after=0, limit=None):
+        """
+        Yields the events with seq greater than after, in order, at most limit of them.
+        Raises LookupError if events after the cursor have already been pruned or are missing, the consumer has to
+        resync.
+        """
+        segments = self.segments()
+        if segments and after + 1 < segments[0][0]:
+            raise LookupError(f"Change events {after + 1} to {segments[0][0] - 1} have been pruned")
+        remaining = limit
+        expected = after + 1
+        for i, (first_seq, path) in enumerate(segments):
+            next_first = segments[i + 1][0] if i + 1 < len(segments) else None
+            if next_first is not None and next_first <= after + 1:
+                continue
+            with open(path) as f:
+                for line in f:
+                    # A line without its newline is an append still in progress
+                    if not line.endswith('\n'):
+                        break
+                    event = json.loads(line)
+                    if event['seq'] <= after:
+                        continue
+                    if remaining is not None and remaining <= 0:
+                        return
+                    if event['seq'] > expected:
+                        raise LookupError(f"Change events {expected} to {event['seq'] - 1} are missing")
+                    expected = event['seq'] + 1
+                    yield event
+                    if remaining is not None:
+                        remaining -= 1
+
+    def prune(self, now=None):
+        """
+        Deletes the segments, other than the active one, not written to for retention.
+        """
+        cutoff = (now or time.time()) - self.retention.total_seconds()
+        for _, path in self.segments()[:-1]:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                logger.info(f"Pruned change feed segment {path}")
+
+    def load_cursors(self):
+        if not os.path.exists(self.cursors_path):
+            return {}
+        with open(self.cursors_path) as f:
+            return json.load(f)
+
+    def get_cursor(self, consumer):
+        return self.load_cursors().get(consumer, 0)
+
+    def set_cursor(self, consumer, seq):
+        cursors = self.load_cursors()
+        cursors[consumer] = seq
+        tmp_path = f"{self.cursors_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(cursors, f, indent=2)
+        os.replace(tmp_path, self.cursors_path)
@@ -0,0 +1,145 @@
+import re
+import json
+import random
+import logging
+import threading
+from datetime import datetime, timedelta, UTC
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+# Define logger for module
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)  # Default logging level
+
+# If  logger has no handlers add console handler
+if not logger.hasHandlers():
+    console_handler = logging.StreamHandler()
+    formatter = logging.Formatter('%(asctime)s [%(levelname)s] %(filename)s - %(message)s')
+    console_handler.setFormatter(formatter)
+    logger.addHandler(console_handler)
+    logger.propagate = False
+
+# API configuration pointing TrafficIncidents at a FakeIncidentsServer on localhost
+FAKE_API = {'SERVICE': 'traffic/services', 'VERSION_NUMBER': '5', 'ENDPOINT': 'incidentDetails'}
+
+
+class SimulatedIncidents:
+    """
+    Deterministic stand-in for the incidents of a bounding box: incidents appear, see their delay and
+    number of reports evolve, and disappear as the simulated clock advances.
+    """
+    def __init__(self, bbox=(103.6, 1.2, 104.0, 1.47), active=200, lifetime_minutes=90, change_rate=0.05,
+                 seed=0, start_time=None):
+        self.bbox = bbox
+        self.active = active
+        self.lifetime = timedelta(minutes=lifetime_minutes)
+        self.change_rate = change_rate
+        self.random = random.Random(seed)
+        self.now = start_time or datetime.now(UTC)
+        self.counter = 0
+        self.incidents = {}
+        self.lock = threading.Lock()
+        for _ in range(active):
+            self._spawn(self.now - self.random.random() * self.lifetime)
+
+    def _spawn(self, start_time):
+        self.counter += 1
+        min_lon, min_lat, max_lon, max_lat = self.bbox
+        lon, lat = self.random.uniform(min_lon, max_lon), self.random.uniform(min_lat, max_lat)
+        vertices = self.random.randint(2, 40)
+        coordinates = [[round(lon + i * 0.0004, 6), round(lat + self.random.uniform(-0.0002, 0.0002), 6)]
+                       for i in range(vertices)]
+        incident_id = f"fake{self.counter:08d}"
+        self.incidents[incident_id] = {
+            'type': 'Feature',
+            'geometry': {'type': 'LineString', 'coordinates': coordinates},
+            'properties': {
+                'id': incident_id,
+                'iconCategory': self.random.choice([1, 6, 6, 6, 7, 8, 9, 14]),
+                'magnitudeOfDelay': self.random.randint(0, 4),
+                'events': [{'description': 'Stationary traffic', 'code': 101, 'iconCategory': 6}],
+                'startTime': start_time.strftime('%Y-%m-%dT%H:%M:%SZ'),
+                'endTime': None,
+                'from': 'From road',
+                'to': 'To road',
+                'length': vertices * 40.0,
+                'delay': self.random.randint(0, 600),
+                'roadNumbers': self.random.choice([['PIE'], ['CTE'], ['AYE'], ['ECP', 'PIE'], []]),
+                'timeValidity': 'present',
+                'probabilityOfOccurrence': 'certain',
+                'numberOfReports': 1,
+                'lastReportTime': start_time.strftime('%Y-%m-%dT%H:%M:%SZ'),
+                'tmc': None,
+            },
+        }
+
+    def advance(self, seconds):
+        """
+        Moves the simulated clock forward, ending expired incidents, updating some and spawning replacements.
+        """
+        with self.lock:
+            self.now += timedelta(seconds=seconds)
+            for incident_id, incident in list(self.incidents.items()):
+                properties = incident['properties']
+                if datetime.fromisoformat(properties['startTime']) + self.lifetime < self.now:
+                    del self.incidents[incident_id]
+                elif self.random.random() < self.change_rate:
+                    properties['delay'] = (properties['delay'] or 0) + self.random.randint(0, 120)
+                    properties['numberOfReports'] += 1
+                    properties['lastReportTime'] = self.now.strftime('%Y-%m-%dT%H:%M:%SZ')
+            while len(self.incidents) < self.active:
+                self._spawn(self.now)
+
+    def query(self, fields=None, ids=None):
+        with self.lock:
+            incidents = list(self.incidents.values()) if ids is None else \
+                [self.incidents[i] for i in ids if i in self.incidents]
+            if fields and 'geometry' not in fields:
+                # Projection on the requested properties only, as the API does
+                names = set(re.findall(r'\w+', fields.split('properties{', 1)[-1]))
+                return [{'properties': {k: v for k, v in incident['properties'].items() if k in names}}
+                        for incident in incidents]
+            return json.loads(json.dumps(incidents))
+
+
+class FakeIncidentsServer:
+    """
+    Local HTTP stub of the incidentDetails endpoint (GET with bbox, POST with ids) backed by SimulatedIncidents.
+    """
+    def __init__(self, world=None, host='127.0.0.1', port=0):
+        self.world = world or SimulatedIncidents()
+        world = self.world
+
+        class Handler(BaseHTTPRequestHandler):
+            def _reply(self, incidents):
+                body = json.dumps({'incidents': incidents}).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                query = parse_qs(urlparse(self.path).query)
+                self._reply(world.query(fields=query.get('fields', [None])[0]))
+
+            def do_POST(self):
+                query = parse_qs(urlparse(self.path).query)
+                length = int(self.headers.get('Content-Length', 0))
+                ids = json.loads(self.rfile.read(length) or b'{}').get('ids', [])
+                self._reply(world.query(fields=query.get('fields', [None])[0], ids=ids))
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.api = dict(FAKE_API, BASE_URL=f"http://{host}:{self.server.server_address[1]}")
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        logger.info(f"Fake incidents server listening on {self.api['BASE_URL']}")
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,59 @@
+import numpy as np
+
+# Simplification tolerance in degrees of each level of detail, level 0 is the original geometry
+# (at Singapore's latitude 0.00005 deg is ~5 m, 0.0002 deg ~20 m and 0.001 deg ~110 m)
+LOD_TOLERANCES = {
+    1: 0.00005,
+    2: 0.0002,
+    3: 0.001,
+}
+
+
+def simplify(coordinates, tolerance):
+    """
+    Douglas-Peucker simplification of a list of [lon, lat] vertices, keeping both end points.
+    Each split evaluates the distances of all the points of its span in one vectorised step.
+    """
+    points = np.asarray(coordinates, dtype=np.float64).reshape(-1, 2)
+    if len(points) < 3 or tolerance <= 0:
+        return points.tolist()
+
+    keep = np.zeros(len(points), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        start, end = points[first], points[last]
+        span = points[first + 1:last]
+        segment = end - start
+        length = np.hypot(*segment)
+        if length == 0:
+            distances = np.hypot(*(span - start).T)
+        else:
+            distances = np.abs(segment[0] * (span[:, 1] - start[1]) - segment[1] * (span[:, 0] - start[0])) / length
+        index = int(np.argmax(distances))
+        if distances[index] > tolerance:
+            split = first + 1 + index
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+    return points[keep].tolist()
+
+
+def levels_of_detail(geometry_type, coordinates):
+    """
+    Simplified coordinates of a LineString at every level of LOD_TOLERANCES, as {level: coordinates}.
+    Levels that would not drop any vertex are left out and readers fall back to the original, except the
+    coarsest level which is always present so it marks the geometry as processed. Points have no levels.
+    """
+    if geometry_type != 'LineString':
+        return {}
+    coarsest = max(LOD_TOLERANCES)
+    levels = {}
+    for level, tolerance in LOD_TOLERANCES.items():
+        simplified = simplify(coordinates, tolerance)
+        if len(simplified) < len(coordinates) or level == coarsest:
+            levels[level] = simplified
+    return levels
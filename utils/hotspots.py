@@ -0,0 +1,217 @@
+import json
+import logging
+from collections import deque
+from datetime import datetime, UTC
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+from .incidents_database import to_datetime
+
+# Define logger for module
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)  # Default logging level
+
+# If  logger has no handlers add console handler
+if not logger.hasHandlers():
+    console_handler = logging.StreamHandler()
+    formatter = logging.Formatter('%(asctime)s [%(levelname)s] %(filename)s - %(message)s')
+    console_handler.setFormatter(formatter)
+    logger.addHandler(console_handler)
+    logger.propagate = False
+
+WEEKDAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+# Ids bound in each IN (...) lookup of update(), below SQLite's limit of 32766 variables
+LOOKUP_IDS = 5000
+
+
+def state_path(path):
+    """
+    Path of a saved grid, np.savez_compressed appends .npz to names without it.
+    """
+    return path if path.endswith('.npz') else f"{path}.npz"
+
+
+def densify(coordinates, spacing):
+    """
+    Samples a list of [lon, lat] vertices every spacing degrees along each segment, as an (n, 2) array.
+    """
+    points = np.asarray(coordinates, dtype=np.float64).reshape(-1, 2)
+    if len(points) < 2:
+        return points
+    starts, ends = points[:-1], points[1:]
+    steps = np.maximum(np.ceil(np.hypot(*(ends - starts).T) / spacing).astype(int), 1)
+    segment = np.repeat(np.arange(len(starts)), steps)
+    fraction = (np.arange(steps.sum()) - np.repeat(np.cumsum(steps) - steps, steps)) / np.repeat(steps, steps)
+    samples = starts[segment] + (ends[segment] - starts[segment]) * fraction[:, None]
+    return np.vstack([samples, points[-1:]])
+
+
+class HotspotGrid:
+    """
+    Spatio-temporal occurrence and delay aggregates of ended incidents.
+
+    The bounding box is hashed into square cells of cell_size degrees and the week into bins of bin_minutes
+    (local time of timezone). Every incident geometry is densified to half a cell, so each incident counts once
+    in every cell it crosses, in the time-of-week bin of its startTime. Aggregates are (bins x rows x cols)
+    arrays built with a single np.add.at per batch, and update() only adds the ended incidents not processed yet.
+    """
+    def __init__(self, bbox, cell_size=0.005, bin_minutes=60, timezone='Asia/Singapore'):
+        self.min_lon, self.min_lat, self.max_lon, self.max_lat = bbox
+        self.cell_size = cell_size
+        self.bin_minutes = bin_minutes
+        self.timezone = timezone
+        self.tz = ZoneInfo(timezone)
+        self.cols = int(np.ceil((self.max_lon - self.min_lon) / cell_size))
+        self.rows = int(np.ceil((self.max_lat - self.min_lat) / cell_size))
+        self.bins = 7 * 24 * 60 // bin_minutes
+        self.counts = np.zeros((self.bins, self.rows, self.cols), dtype=np.int32)
+        self.delay = np.zeros((self.bins, self.rows, self.cols), dtype=np.float64)
+        self.processed = set()
+
+    def time_bin(self, start_time):
+        local = to_datetime(start_time).astimezone(self.tz)
+        return (local.weekday() * 24 * 60 + local.hour * 60 + local.minute) // self.bin_minutes
+
+    def densify(self, coordinates):
+        return densify(coordinates, self.cell_size / 2)
+
+    def add(self, rows):
+        """
+        Adds (id, geometry_type, coordinates JSON, startTime, delay) rows to the aggregates.
+        """
+        samples, owners, bins, delays = [], [], [], []
+        for incident_id, geometry_type, coordinates, start_time, delay in rows:
+            if incident_id in self.processed or not start_time:
+                continue
+            try:
+                coordinates = json.loads(coordinates)
+            except (TypeError, json.JSONDecodeError):
+                logger.warning(f"Invalid coordinates for incident ID: {incident_id}")
+                continue
+            points = self.densify([coordinates] if geometry_type == 'Point' else coordinates)
+            samples.append(points)
+            owners.append(np.full(len(points), len(bins)))
+            bins.append(self.time_bin(start_time))
+            delays.append(delay or 0)
+            self.processed.add(incident_id)
+        if not samples:
+            return 0
+
+        points = np.vstack(samples)
+        owner = np.concatenate(owners)
+        col = np.floor((points[:, 0] - self.min_lon) / self.cell_size).astype(np.int64)
+        row = np.floor((points[:, 1] - self.min_lat) / self.cell_size).astype(np.int64)
+        inside = (col >= 0) & (col < self.cols) & (row >= 0) & (row < self.rows)
+
+        # One hit per incident and cell, however many samples fall into it
+        cells = np.unique(owner[inside] * (self.rows * self.cols) + row[inside] * self.cols + col[inside])
+        owner, cell = np.divmod(cells, self.rows * self.cols)
+        row, col = np.divmod(cell, self.cols)
+        time_bin = np.asarray(bins)[owner]
+        np.add.at(self.counts, (time_bin, row, col), 1)
+        np.add.at(self.delay, (time_bin, row, col), np.asarray(delays, dtype=np.float64)[owner])
+        return len(bins)
+
+    def update(self, db, batch_size=5000):
+        """
+        Adds the ended incidents not processed yet, db is a TrafficIncidentsDB or an IncidentsReader.
+        Incidents are ended with a backdated endTime, so no time watermark is safe: only the ids of the ended
+        incidents are scanned, and the geometries are fetched for the new ids alone. The read-only connection
+        cannot fill a temp table, the ids are bound in batches of LOOKUP_IDS instead.
+        """
+        ids_query = "SELECT id FROM {incidents} WHERE endTime IS NOT NULL AND endTime != ''"
+        new_ids = [row[0] for row in db.query_partitions(ids_query, batch_size=batch_size)
+                   if row[0] not in self.processed]
+        added = 0
+        for i in range(0, len(new_ids), LOOKUP_IDS):
+            ids = new_ids[i:i + LOOKUP_IDS]
+            query = f'''
+                SELECT id, geometry_type, coordinates, startTime, delay FROM {{incidents}}
+                WHERE id IN ({', '.join('?' * len(ids))})
+            '''
+            batch = []
+            for row in db.query_partitions(query, ids, batch_size=batch_size):
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    added += self.add(batch)
+                    batch = []
+            added += self.add(batch)
+        logger.info(f"Added {added} incident(s) to the hotspot grid.")
+        return added
+
+    def cell_bounds(self, row, col):
+        lon = self.min_lon + col * self.cell_size
+        lat = self.min_lat + row * self.cell_size
+        return lon, lat, lon + self.cell_size, lat + self.cell_size
+
+    def bin_label(self, time_bin):
+        minutes = time_bin * self.bin_minutes
+        return f"{WEEKDAYS[minutes // 1440]} {minutes % 1440 // 60:02d}:{minutes % 60:02d}"
+
+    def hotspots(self, min_occurrences=5, top=20):
+        """
+        Clusters hot (time bin, cell) entries that touch in space or in adjacent time bins (the week wraps
+        around) and returns the clusters ranked by total delay.
+        """
+        hot = self.counts >= min_occurrences
+        seen = np.zeros_like(hot)
+        clusters = []
+        for start in zip(*np.nonzero(hot)):
+            if seen[start]:
+                continue
+            seen[start] = True
+            queue, members = deque([start]), []
+            while queue:
+                b, r, c = queue.popleft()
+                members.append((b, r, c))
+                for db_ in (-1, 0, 1):
+                    for dr in (-1, 0, 1):
+                        for dc in (-1, 0, 1):
+                            nb, nr, nc = (b + db_) % self.bins, r + dr, c + dc
+                            if 0 <= nr < self.rows and 0 <= nc < self.cols and hot[nb, nr, nc] and not seen[nb, nr, nc]:
+                                seen[nb, nr, nc] = True
+                                queue.append((nb, nr, nc))
+            clusters.append(members)
+
+        results = []
+        for members in clusters:
+            b, r, c = (np.array(axis) for axis in zip(*members))
+            occurrences = int(self.counts[b, r, c].sum())
+            total_delay = float(self.delay[b, r, c].sum())
+            weights = self.counts[b, r, c]
+            results.append({
+                'time_bins': sorted({self.bin_label(int(x)) for x in set(b)}),
+                'cells': len({(int(x), int(y)) for x, y in zip(r, c)}),
+                'occurrences': occurrences,
+                'total_delay': total_delay,
+                'mean_delay': total_delay / occurrences if occurrences else 0,
+                'centroid': (float(np.average(self.min_lon + (c + 0.5) * self.cell_size, weights=weights)),
+                             float(np.average(self.min_lat + (r + 0.5) * self.cell_size, weights=weights))),
+                'bbox': (*self.cell_bounds(int(r.min()), int(c.min()))[:2], *self.cell_bounds(int(r.max()), int(c.max()))[2:]),
+            })
+        results.sort(key=lambda result: result['total_delay'], reverse=True)
+        return results[:top]
+
+    def save(self, path):
+        path = state_path(path)
+        np.savez_compressed(path, counts=self.counts, delay=self.delay,
+                            processed=np.array(sorted(self.processed)),
+                            meta=np.array(json.dumps({
+                                'bbox': [self.min_lon, self.min_lat, self.max_lon, self.max_lat],
+                                'cell_size': self.cell_size, 'bin_minutes': self.bin_minutes,
+                                'timezone': self.timezone,
+                                'saved': datetime.now(UTC).isoformat()})))
+        logger.info(f"Hotspot grid saved to {path}")
+
+    @classmethod
+    def load(cls, path):
+        with np.load(state_path(path)) as data:
+            meta = json.loads(str(data['meta']))
+            grid = cls(meta['bbox'], cell_size=meta['cell_size'], bin_minutes=meta['bin_minutes'],
+                       timezone=meta['timezone'])
+            grid.counts = data['counts']
+            grid.delay = data['delay']
+            grid.processed = set(data['processed'].tolist())
+        return grid
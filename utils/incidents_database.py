@@ -1,8 +1,9 @@
 import os
+import stat
 import logging
 import json
-import geojson
 from datetime import datetime, timedelta, UTC
+from pathlib import Path
 import sqlite3
 
 # Define logger for module
@@ -17,8 +18,326 @@ if not logger.hasHandlers():
     logger.addHandler(console_handler)
     logger.propagate = False
 
-class TrafficIncidentsDB:
-    def __init__(self, dir_path = None, db_path = None, location=None):
+# strftime formats of the partition keys, they sort in chronological order
+PARTITION_FORMATS = {
+    'day': '%Y-%m-%d',
+    'week': '%G-W%V',
+    'month': '%Y-%m',
+    'year': '%Y',
+}
+
+# Open incidents are carried over to the new partition on rollover
+OPEN_CONDITION = "endTime IS NULL OR endTime = ''"
+
+# Stored columns reported in change feed events, last_seen changes on every poll and is left out
+FEED_COLUMNS = [
+    'type', 'category', 'geometry_type', 'coordinates', 'magnitudeOfDelay', 'startTime', 'endTime', 'from_location',
+    'to_location', 'length', 'delay', 'roadNumbers', 'timeValidity', 'probabilityOfOccurrence', 'numberOfReports',
+    'lastReportTime', 'countryCode', 'tableNumber', 'tableVersion', 'direction',
+]
+
+# Side tables, referenced in partition queries as {placeholder}: (table, incident id column of the rows copied
+# verbatim on carry-over or None, empty stand-in used for partitions created before the table existed)
+SIDE_TABLES = {
+    'lod': ('incident_geometry_lod', 'id', 'SELECT NULL AS id, NULL AS level, NULL AS coordinates WHERE 0'),
+    'roads': ('roads', None, 'SELECT NULL AS road_id, NULL AS name WHERE 0'),
+    'incident_roads': ('incident_roads', None, 'SELECT NULL AS road_id, NULL AS start_jd, NULL AS incident_id WHERE 0'),
+}
+
+SIDE_TABLES_SCHEMA = [
+    # Simplified geometries of each incident, one row per level of detail
+    '''
+    CREATE TABLE IF NOT EXISTS incident_geometry_lod (
+        id TEXT,
+        level INTEGER,
+        coordinates TEXT,
+        PRIMARY KEY (id, level)
+    )
+    ''',
+    # Road numbers of the incidents, normalised so per-road queries are index range scans by road and startTime
+    '''
+    CREATE TABLE IF NOT EXISTS roads (
+        road_id INTEGER PRIMARY KEY,
+        name TEXT UNIQUE NOT NULL
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS incident_roads (
+        road_id INTEGER NOT NULL,
+        start_jd REAL NOT NULL,
+        incident_id TEXT NOT NULL,
+        PRIMARY KEY (road_id, start_jd, incident_id)
+    ) WITHOUT ROWID
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_incident_roads_incident ON incident_roads (incident_id)',
+]
+
+
+def readonly_uri(path):
+    """
+    SQLite URI opening path read-only, for connections created with uri=True.
+    """
+    return f"{Path(path).absolute().as_uri()}?mode=ro"
+
+
+def to_datetime(value):
+    """
+    Parses ISO strings (including a trailing Z) to timezone aware datetimes, naive values are taken as UTC.
+    """
+    if value is None or value == '':
+        return None
+    if not isinstance(value, datetime):
+        value = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=UTC)
+    return value
+
+
+class IncidentsQueries:
+    """
+    Read queries shared by the writer and the read-only connection, they span every partition in the manifest.
+    Subclasses provide conn, dir_path and manifest.
+    """
+    def closed_partitions(self, start=None, end=None):
+        """
+        Paths of the closed partitions whose incidents overlap start..end (all of them when no bounds are given).
+        """
+        start, end = to_datetime(start), to_datetime(end)
+        paths = []
+        for entry in self.manifest['partitions'].values():
+            if not entry.get('closed') or entry.get('min_start') is None:
+                continue
+            if end and to_datetime(entry['min_start']) > end:
+                continue
+            if start and to_datetime(entry['max_end']) < start:
+                continue
+            paths.append(os.path.join(self.dir_path, entry['path']))
+        return paths
+
+    @staticmethod
+    def window_condition(start_datetime, end_datetime, alias='i.'):
+        """
+        SQL condition and params matching the incidents starting or ending between start_datetime and
+        end_datetime. Times are compared as julian days, the stored strings mix offsets and Z suffixes.
+        """
+        start, end = to_datetime(start_datetime).isoformat(), to_datetime(end_datetime).isoformat()
+        condition = (f'(julianday({alias}startTime) BETWEEN julianday(?) AND julianday(?)) '
+                     f'OR (julianday({alias}endTime) BETWEEN julianday(?) AND julianday(?))')
+        return condition, (start, end, start, end)
+
+    @staticmethod
+    def fetch_batches(cursor, batch_size):
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            yield from rows
+
+    def format_query(self, query, schema):
+        existing = {row[0] for row in self.conn.execute(f"SELECT name FROM {schema}.sqlite_master WHERE type = 'table'")}
+        tables = {'incidents': f'{schema}.incidents'}
+        for placeholder, (table, _, empty) in SIDE_TABLES.items():
+            tables[placeholder] = f'{schema}.{table}' if table in existing else f'({empty})'
+        return query.format(**tables)
+
+    def query_partitions(self, query, params=(), start=None, end=None, batch_size=1000):
+        """
+        Streams the rows of query over the current partition and every closed partition overlapping start..end,
+        batch_size rows at a time. The query refers to the incidents table as {incidents} and to the side tables
+        by their SIDE_TABLES placeholder.
+        """
+        cursor = self.conn.cursor()
+        yield from self.fetch_batches(cursor.execute(self.format_query(query, 'main'), params), batch_size)
+        for path in self.closed_partitions(start, end):
+            cursor.execute('ATTACH DATABASE ? AS partition', (readonly_uri(path),))
+            try:
+                yield from self.fetch_batches(cursor.execute(self.format_query(query, 'partition'), params), batch_size)
+            finally:
+                cursor.execute('DETACH DATABASE partition')
+
+    def get_geometries(self, start_datetime, end_datetime, detail=0):
+        """
+        Streams (id, geometry_type, coordinates) of the incidents starting or ending between start_datetime and
+        end_datetime, simplified to the given level of detail (0 is the original geometry, see LOD_TOLERANCES).
+        """
+        condition, window = self.window_condition(start_datetime, end_datetime)
+        query = f'''
+            SELECT i.id, i.geometry_type, coalesce(l.coordinates, i.coordinates)
+            FROM {{incidents}} AS i LEFT JOIN {{lod}} AS l ON l.id = i.id AND l.level = ?
+            WHERE {condition}
+        '''
+        params = (detail, *window)
+        for id_, geometry_type, coordinates in self.query_partitions(query, params, start=start_datetime, end=end_datetime):
+            yield id_, geometry_type, json.loads(coordinates)
+
+    def road_stats(self, start_datetime, end_datetime, roads=None):
+        """
+        Per-road totals of the incidents starting between start_datetime and end_datetime, as
+        {road: {'incidents': count, 'delay': seconds, 'duration': seconds}}, for the given road numbers or all roads.
+        Open incidents last until they were last seen.
+        """
+        start, end = to_datetime(start_datetime), to_datetime(end_datetime)
+        roads = list(roads or [])
+        road_filter = f"AND r.name IN ({', '.join('?' * len(roads))})" if roads else ''
+        query = f'''
+            SELECT r.name, count(*), sum(coalesce(i.delay, 0)),
+                   sum((julianday(coalesce(nullif(i.endTime, ''), i.last_seen)) - julianday(i.startTime)) * 86400)
+            FROM {{roads}} AS r
+            JOIN {{incident_roads}} AS ir ON ir.road_id = r.road_id
+            JOIN {{incidents}} AS i ON i.id = ir.incident_id
+            WHERE ir.start_jd BETWEEN julianday(?) AND julianday(?) {road_filter}
+            GROUP BY r.name
+        '''
+        stats = {}
+        for name, count, delay, duration in self.query_partitions(
+                query, (start.isoformat(), end.isoformat(), *roads), start=start, end=end):
+            totals = stats.setdefault(name, {'incidents': 0, 'delay': 0.0, 'duration': 0.0})
+            totals['incidents'] += count
+            totals['delay'] += delay or 0
+            totals['duration'] += duration or 0
+        return stats
+
+    def iter_features(self, where, params=(), start=None, end=None, detail=0):
+        """
+        Streams the incidents matching where (columns prefixed with i.) as GeoJSON Feature dicts, with geometries
+        at the given level of detail. start and end limit the closed partitions that are attached.
+        """
+        rows = self.query_partitions(f'''
+            SELECT i.id, i.type, i.category, i.geometry_type, coalesce(l.coordinates, i.coordinates),
+                   i.magnitudeOfDelay, i.startTime, i.endTime, i.from_location, i.to_location, i.length, i.delay,
+                   i.roadNumbers, i.timeValidity, i.probabilityOfOccurrence, i.numberOfReports, i.lastReportTime,
+                   i.countryCode, i.tableNumber, i.tableVersion, i.direction
+            FROM {{incidents}} AS i LEFT JOIN {{lod}} AS l ON l.id = i.id AND l.level = ?
+            WHERE {where}
+        ''', (detail, *params), start=start, end=end)
+
+        for row in rows:
+            (id_, type_, category, geometry_type, coordinates, magnitudeOfDelay, startTime,
+             endTime, from_location, to_location, length, delay, roadNumbers,
+             timeValidity, probabilityOfOccurrence, numberOfReports, lastReportTime,
+             countryCode, tableNumber, tableVersion, direction) = row
+
+            # Convert coordinates from JSON string to list
+            try:
+                coordinates = json.loads(coordinates)
+            except json.JSONDecodeError:
+                logger.warning(f"Invalid coordinates for incident ID: {id_}")
+                continue
+
+            # Define geometry
+            if geometry_type not in ('Point', 'LineString'):
+                logger.warning(f"Unsupported geometry type for incident ID: {id_}")
+                continue
+            geometry = {'type': geometry_type, 'coordinates': coordinates}
+
+            # Define properties
+            properties = {
+                'id': id_,
+                'type': type_,
+                'category': category,
+                'magnitudeOfDelay': magnitudeOfDelay,
+                'startTime': startTime,
+                'endTime': endTime,
+                'from_location': from_location,
+                'to_location': to_location,
+                'length': length,
+                'delay': delay,
+                'roadNumbers': roadNumbers,
+                'timeValidity': timeValidity,
+                'probabilityOfOccurrence': probabilityOfOccurrence,
+                'numberOfReports': numberOfReports,
+                'lastReportTime': lastReportTime,
+                'countryCode': countryCode,
+                'tableNumber': tableNumber,
+                'tableVersion': tableVersion,
+                'direction': direction
+            }
+
+            yield {'type': 'Feature', 'geometry': geometry, 'properties': properties}
+
+    def export_to_geojson(self, start_datetime, end_datetime, output_file, detail=0):
+        """
+        Exports the incidents starting or ending between start_datetime and end_datetime to GeoJSON.
+        detail > 0 writes geometries simplified to that level of detail (see LOD_TOLERANCES), for smaller files.
+        """
+        import geojson
+
+        try:
+            condition, params = self.window_condition(start_datetime, end_datetime)
+            features = list(self.iter_features(condition, params, start=start_datetime, end=end_datetime,
+                                               detail=detail))
+
+            feature_collection = geojson.FeatureCollection(features)
+            with open(output_file, 'w') as f:
+                geojson.dump(feature_collection, f)
+            logger.info(f"Exported {len(features)} incidents to GeoJSON: {output_file}")
+        except Exception as e:
+            logger.error(f"Error exporting to GeoJSON: {e}", exc_info=True)
+
+    def get_live_features(self, detail=0):
+        """
+        GeoJSON Feature dicts of the open incidents, which all live in the current partition.
+        """
+        now = datetime.now(UTC)
+        return list(self.iter_features("i.endTime IS NULL OR i.endTime = ''", start=now, end=now, detail=detail))
+
+    def get_series(self, start_datetime, end_datetime, step=timedelta(hours=1)):
+        """
+        Rollup of the incidents starting between start_datetime and end_datetime into buckets of step, as a list of
+        {'start': ISO time, 'incidents': count, 'delay': seconds} with empty buckets included.
+        """
+        start, end = to_datetime(start_datetime), to_datetime(end_datetime)
+        step_days = step.total_seconds() / 86400
+        buckets = int((end - start) / step) + 1
+        counts, delays = [0] * buckets, [0.0] * buckets
+        query = '''
+            SELECT CAST((julianday(startTime) - julianday(?)) / ? AS INTEGER) AS bucket, count(*), sum(coalesce(delay, 0))
+            FROM {incidents}
+            WHERE julianday(startTime) BETWEEN julianday(?) AND julianday(?)
+            GROUP BY bucket
+        '''
+        params = (start.isoformat(), step_days, start.isoformat(), end.isoformat())
+        for bucket, count, delay in self.query_partitions(query, params, start=start, end=end):
+            if 0 <= bucket < buckets:
+                counts[bucket] += count
+                delays[bucket] += delay or 0
+        return [{'start': (start + i * step).isoformat(), 'incidents': counts[i], 'delay': delays[i]}
+                for i in range(buckets)]
+
+    def get_earliest_and_latest_start_times(self):
+        """
+        Get the earliest and latest start times from the incidents.
+        """
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute('''
+                SELECT MIN(startTime), MAX(startTime) FROM incidents
+            ''')
+            result = cursor.fetchone()
+            earliest_start_time, latest_start_time = result
+
+            # Closed partitions are covered by the bounds recorded in the manifest
+            for entry in self.manifest['partitions'].values():
+                if not entry.get('closed') or entry.get('min_start') is None:
+                    continue
+                if earliest_start_time is None or to_datetime(entry['min_start']) < to_datetime(earliest_start_time):
+                    earliest_start_time = entry['min_start']
+                if latest_start_time is None or to_datetime(entry['max_start']) > to_datetime(latest_start_time):
+                    latest_start_time = entry['max_start']
+            return earliest_start_time, latest_start_time
+        except Exception as e:
+            logger.error(f"Error getting earliest and latest start times from database: {e}", exc_info=True)
+            return None, None
+
+
+class TrafficIncidentsDB(IncidentsQueries):
+    def __init__(self, dir_path = None, db_path = None, location=None, partition=None):
+        """
+        partition ('day', 'week', 'month' or 'year') splits the database into one file per period.
+        Writes only go to the current partition, closed partitions are compacted once and made read-only,
+        and range queries only attach the closed partitions overlapping the range.
+        A database that is already partitioned keeps the period recorded in its manifest, partition may be left out.
+        """
         if dir_path:
             self.dir_path = dir_path
         elif db_path:
@@ -27,13 +346,42 @@ class TrafficIncidentsDB:
             self.db_path = os.path.join(self.dir_path, f"{location}_Incidents.db")
         else : 
             self.db_path = db_path
-        self.conn = sqlite3.connect(self.db_path)
+
+        # The single file of a partitioned database is a closed partition, it must not be opened for writing
+        root, _ = os.path.splitext(self.db_path)
+        self.manifest_path = f"{root}_partitions.json"
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                recorded = json.load(f).get('partition')
+            if partition and partition != recorded:
+                raise ValueError(f"{self.db_path} is partitioned by {recorded}, not {partition}")
+            partition = recorded
+
+        self.partition = partition
+        self.partition_key = None
+        self.manifest = {'partitions': {}}
+        if partition:
+            if partition not in PARTITION_FORMATS:
+                raise ValueError(f"Unknown partition period {partition}, expected one of {list(PARTITION_FORMATS)}")
+            self.base_path = self.db_path
+            self.load_manifest()
+            # Provisional until the first write, which moves an empty current partition to its own period
+            self.partition_key = self.manifest.get('current') or datetime.now(UTC).strftime(PARTITION_FORMATS[partition])
+            self.db_path = self.partition_path(self.partition_key)
+            self.first_write = True
+
+        self.conn = sqlite3.connect(self.db_path, uri=True)
         logger.info(f"Connection to {self.db_path} database established")
         self.initialize_db()
+        if partition:
+            self.register_partition(self.partition_key, self.db_path)
+            self.adopt_unpartitioned()
         self.optimize()
 
     def initialize_db(self):
         cursor = self.conn.cursor()
+        # WAL lets IncidentsReader connections read a consistent snapshot while polls are written
+        cursor.execute('PRAGMA journal_mode = WAL')
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS incidents (
                 id TEXT PRIMARY KEY,
@@ -60,15 +408,32 @@ class TrafficIncidentsDB:
                 last_seen TEXT
             )
         ''')
+        for statement in SIDE_TABLES_SCHEMA:
+            cursor.execute(statement)
+        # Change feed events, committed with the changes they describe and deleted once exported by ChangeFeed
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS changelog (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                time TEXT,
+                op TEXT,
+                id TEXT,
+                fields TEXT
+            )
+        ''')
+        # Open incidents are the only ones scanned when marking ended incidents
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_incidents_open ON incidents (last_seen)
+            WHERE endTime IS NULL OR endTime = ''
+        ''')
         self.conn.commit()
         logger.info(f"{self.db_path} database initialised and passed checks")
         
 
-    def insert_incident(self, incident):
+    def insert_incident(self, incident, current_time=None, commit=True):
         properties = incident['properties']
         incident_id = properties['id']
         new_delay = properties.get('delay') or 0  # None as 0
-        current_time = datetime.now(UTC)
+        current_time = current_time or datetime.now(UTC)
 
         try:
             # Check existing delay and endTime
@@ -126,7 +491,8 @@ class TrafficIncidentsDB:
                         current_time,
                         incident_id
                     ))
-                    self.conn.commit()
+                    if commit:
+                        self.conn.commit()
                     logger.debug(f"Updated incident {incident_id} with new delay and endTime.")
                     return True, False
                 else:
@@ -139,7 +505,8 @@ class TrafficIncidentsDB:
                         current_time,
                         incident_id
                     ))
-                    self.conn.commit()
+                    if commit:
+                        self.conn.commit()
                     logger.debug(f"Updated last_seen for incident {incident_id}.")
                     return False, False
             else:
@@ -175,7 +542,8 @@ class TrafficIncidentsDB:
                     properties['tmc'].get('direction') if properties.get('tmc') else None,
                     current_time
                 ))
-                self.conn.commit()
+                if commit:
+                    self.conn.commit()
                 logger.debug(f"Inserted new incident {incident_id} into the database.")
                 return True, True
         except sqlite3.IntegrityError as e:
@@ -185,147 +553,434 @@ class TrafficIncidentsDB:
             logger.error(f"Unexpected error: {e}", exc_info=True)
             return False, False
 
-    def update_incidents(self, incidents):
+    def update_incidents(self, incidents, current_time=None, changelog=None):
+        """
+        Inserts or updates every incident of a poll in a single transaction.
+        current_time overrides the last_seen timestamp, e.g. when replaying archived polls.
+        If changelog is a list, an insert or update event with the changed columns is appended for each incident,
+        and logged to the changelog table in the same transaction.
+        """
         changes = 0
         inserts = 0
+        current_time = current_time or datetime.now(UTC)
+        if self.partition:
+            self.rollover(current_time)
+        if changelog is not None:
+            previous = self.get_incident_rows([incident['properties']['id'] for incident in incidents])
+        changed_incidents = []
         for incident in incidents:
-            changed, inserted = self.insert_incident(incident)
+            changed, inserted = self.insert_incident(incident, current_time=current_time, commit=False)
             if changed:
                 changes += 1
+                changed_incidents.append(incident)
             if inserted:
                 inserts += 1
+        self.store_levels_of_detail(changed_incidents)
+        self.store_roads([(incident['properties']['id'], incident['properties'].get('roadNumbers') or [],
+                           incident['properties'].get('startTime')) for incident in changed_incidents])
+        if changelog is not None:
+            events = []
+            current = self.get_incident_rows([incident['properties']['id'] for incident in changed_incidents])
+            for incident_id, row in current.items():
+                before = previous.get(incident_id)
+                if before is None:
+                    events.append({'op': 'insert', 'id': incident_id, 'fields': row})
+                else:
+                    fields = {column: value for column, value in row.items() if before[column] != value}
+                    events.append({'op': 'update', 'id': incident_id, 'fields': fields})
+            self.log_changes(events, current_time)
+            changelog.extend(events)
+        self.conn.commit()
         logger.info(f"{inserts} new incident(s) inserted of {changes} changes to DB (of {len(incidents)} current).")
         return changes, inserts
 
-    def mark_ended_incidents(self, threshold_minutes=5):
+    def store_levels_of_detail(self, incidents, conn=None):
+        """
+        Precomputes the simplified geometries of inserted or changed incidents, replacing previous ones.
+        """
+        from .geometry import levels_of_detail
+
+        ids, rows = [], []
+        for incident in incidents:
+            incident_id = incident['properties']['id']
+            geometry = incident['geometry']
+            ids.append((incident_id,))
+            for level, coordinates in levels_of_detail(geometry['type'], geometry['coordinates']).items():
+                rows.append((incident_id, level, json.dumps(coordinates)))
+        cursor = (conn or self.conn).cursor()
+        cursor.executemany('DELETE FROM incident_geometry_lod WHERE id = ?', ids)
+        cursor.executemany('INSERT INTO incident_geometry_lod (id, level, coordinates) VALUES (?, ?, ?)', rows)
+
+    def backfill_levels_of_detail(self, batch_size=1000, conn=None):
+        """
+        Computes the simplified geometries of stored LineStrings that have none yet (databases created before
+        levels of detail existed). Returns the number of incidents processed.
+        """
+        conn = conn or self.conn
+        cursor = conn.cursor()
+        processed = 0
+        while True:
+            rows = cursor.execute('''
+                SELECT id, geometry_type, coordinates FROM incidents
+                WHERE geometry_type = 'LineString' AND id NOT IN (SELECT id FROM incident_geometry_lod)
+                LIMIT ?
+            ''', (batch_size,)).fetchall()
+            if not rows:
+                break
+            incidents = []
+            for incident_id, geometry_type, coordinates in rows:
+                try:
+                    coordinates = json.loads(coordinates)
+                except (TypeError, json.JSONDecodeError):
+                    coordinates = []
+                incidents.append({'properties': {'id': incident_id}, 'geometry': {'type': geometry_type, 'coordinates': coordinates}})
+            self.store_levels_of_detail(incidents, conn=conn)
+            conn.commit()
+            processed += len(rows)
+        logger.info(f"Backfilled levels of detail of {processed} incident(s).")
+        return processed
+
+    def store_roads(self, rows, conn=None):
         """
-        Marks incidents as ended if they haven't been seen for threshold_minutes.
+        Links (incident id, road numbers, startTime) rows to the roads table, replacing previous links.
+        Road numbers are a list or the comma-joined roadNumbers column.
+        """
+        links = []
+        for incident_id, road_numbers, start_time in rows:
+            if isinstance(road_numbers, str):
+                road_numbers = road_numbers.split(',')
+            links.extend((name.strip(), start_time, incident_id) for name in road_numbers if name and name.strip())
+        cursor = (conn or self.conn).cursor()
+        cursor.executemany('DELETE FROM incident_roads WHERE incident_id = ?', ((row[0],) for row in rows))
+        if not links:
+            return
+        cursor.executemany('INSERT OR IGNORE INTO roads (name) VALUES (?)', ((name,) for name in {link[0] for link in links}))
+        road_ids = dict(cursor.execute('SELECT name, road_id FROM roads').fetchall())
+        cursor.executemany('''
+            INSERT OR IGNORE INTO incident_roads (road_id, start_jd, incident_id) VALUES (?, coalesce(julianday(?), 0), ?)
+        ''', ((road_ids[name], start_time, incident_id) for name, start_time, incident_id in links))
+
+    def backfill_roads(self, batch_size=1000, conn=None):
+        """
+        Links stored incidents that have road numbers but no road links yet (databases created before the roads
+        tables existed). Returns the number of incidents processed.
+        """
+        conn = conn or self.conn
+        cursor = conn.cursor()
+        processed = 0
+        while True:
+            rows = cursor.execute('''
+                SELECT id, roadNumbers, startTime FROM incidents
+                WHERE roadNumbers IS NOT NULL AND roadNumbers != ''
+                  AND id NOT IN (SELECT incident_id FROM incident_roads)
+                LIMIT ?
+            ''', (batch_size,)).fetchall()
+            if not rows:
+                break
+            self.store_roads(rows, conn=conn)
+            conn.commit()
+            processed += len(rows)
+        logger.info(f"Backfilled road links of {processed} incident(s).")
+        return processed
+
+    def backfill_closed_partitions(self):
+        """
+        Adds the side tables and their backfilled rows to closed partitions created before they existed,
+        making each file writable for the duration.
+        """
+        for path in self.closed_partitions():
+            conn = sqlite3.connect(path) if os.access(path, os.W_OK) else None
+            if conn is None:
+                os.chmod(path, stat.S_IREAD | stat.S_IWRITE | stat.S_IRGRP | stat.S_IROTH)
+                conn = sqlite3.connect(path)
+            try:
+                for statement in SIDE_TABLES_SCHEMA:
+                    conn.execute(statement)
+                conn.commit()
+                backfilled = self.backfill_levels_of_detail(conn=conn) + self.backfill_roads(conn=conn)
+                if backfilled:
+                    conn.execute('VACUUM')
+            finally:
+                conn.close()
+                os.chmod(path, stat.S_IREAD | stat.S_IRGRP | stat.S_IROTH)
+
+    def get_incident_state(self, ids):
+        """
+        Returns {id: (delay, magnitudeOfDelay, lastReportTime, numberOfReports)} for the given ids already stored.
+        """
+        cursor = self.conn.cursor()
+        cursor.execute('CREATE TEMP TABLE IF NOT EXISTS lookup_ids (id TEXT PRIMARY KEY)')
+        cursor.execute('DELETE FROM temp.lookup_ids')
+        cursor.executemany('INSERT OR IGNORE INTO temp.lookup_ids (id) VALUES (?)', ((i,) for i in ids))
+        cursor.execute('''
+            SELECT id, delay, magnitudeOfDelay, lastReportTime, numberOfReports
+            FROM incidents WHERE id IN (SELECT id FROM temp.lookup_ids)
+        ''')
+        state = {row[0]: tuple(row[1:]) for row in cursor.fetchall()}
+        self.conn.commit()
+        return state
+
+    def get_incident_rows(self, ids):
+        """
+        Returns {id: {column: value}} of the FEED_COLUMNS of the given ids already stored.
+        """
+        cursor = self.conn.cursor()
+        cursor.execute('CREATE TEMP TABLE IF NOT EXISTS lookup_ids (id TEXT PRIMARY KEY)')
+        cursor.execute('DELETE FROM temp.lookup_ids')
+        cursor.executemany('INSERT OR IGNORE INTO temp.lookup_ids (id) VALUES (?)', ((i,) for i in ids))
+        cursor.execute(f'''
+            SELECT id, {', '.join(FEED_COLUMNS)}
+            FROM incidents WHERE id IN (SELECT id FROM temp.lookup_ids)
+        ''')
+        return {row[0]: dict(zip(FEED_COLUMNS, row[1:])) for row in cursor.fetchall()}
+
+    def touch_incidents(self, ids, current_time=None):
+        """
+        Updates last_seen of incidents that are still reported but unchanged, in a single transaction.
+        """
+        current_time = current_time or datetime.now(UTC)
+        if self.partition:
+            self.rollover(current_time)
+        cursor = self.conn.cursor()
+        cursor.executemany('UPDATE incidents SET last_seen = ? WHERE id = ?', ((current_time, i) for i in ids))
+        self.conn.commit()
+        logger.debug(f"Updated last_seen of {len(ids)} unchanged incident(s).")
+
+    def mark_ended_incidents(self, threshold_minutes=5, current_time=None, current_ids=None, changelog=None):
+        """
+        Marks incidents as ended if they haven't been seen for threshold_minutes, in a single UPDATE.
+        If current_ids (the ids of the latest poll) is given, open incidents missing from it are ended immediately.
+        The endTime is the latest of last_seen and startTime + threshold_minutes, normalised to UTC.
+        If changelog is a list, an end event is appended for each ended incident and logged in the same transaction.
+        Returns the list of ended incident ids.
         """
         try:
             cursor = self.conn.cursor()
-            current_time = datetime.now(UTC)
+            current_time = current_time or datetime.now(UTC)
             threshold_time = current_time - timedelta(minutes=threshold_minutes)
             threshold_iso = threshold_time.isoformat()
 
-            # Select incidents where last_seen is older than threshold and endTime is NULL
-            cursor.execute('''
-                SELECT id, last_seen, startTime FROM incidents
-                WHERE last_seen < ? AND (endTime IS NULL OR endTime = '')
-            ''', (threshold_iso, ))
+            # Stale condition compares normalised julian days, last_seen and startTime are stored in different formats
+            condition = 'julianday(last_seen) < julianday(?)'
+            params = [f'+{threshold_minutes} minutes', threshold_iso]
+            if current_ids is not None:
+                cursor.execute('CREATE TEMP TABLE IF NOT EXISTS current_poll (id TEXT PRIMARY KEY)')
+                cursor.execute('DELETE FROM temp.current_poll')
+                cursor.executemany('INSERT OR IGNORE INTO temp.current_poll (id) VALUES (?)', ((i,) for i in current_ids))
+                condition = f'({condition} OR id NOT IN (SELECT id FROM temp.current_poll))'
 
-            ended_incidents = cursor.fetchall()
+            cursor.execute(f'''
+                UPDATE incidents
+                SET endTime = strftime('%Y-%m-%dT%H:%M:%S+00:00', max(
+                    coalesce(julianday(last_seen), 0),
+                    coalesce(julianday(startTime, ?), 0)
+                ))
+                WHERE (endTime IS NULL OR endTime = '') AND {condition}
+                RETURNING id, endTime
+            ''', params)
 
-            for (incident_id, last_seen, start_time) in ended_incidents:
-                # Calculate startTime + threshold
-                start_time_dt = datetime.fromisoformat(start_time)
-                start_time_threshold = start_time_dt + timedelta(minutes=threshold_minutes)
+            ended = cursor.fetchall()
+            ended_ids = [row[0] for row in ended]
+            if changelog is not None:
+                events = [{'op': 'end', 'id': incident_id, 'fields': {'endTime': end_time}}
+                          for incident_id, end_time in ended]
+                self.log_changes(events, current_time)
+                changelog.extend(events)
+            self.conn.commit()
+            logger.info(f"Marked {len(ended_ids)} incident(s) as ended.")
+            return ended_ids
+        except Exception as e:
+            self.conn.rollback()
+            logger.error(f"Error marking ended incidents: {e}", exc_info=True)
+            return []
 
-                # Determine the latest endTime
-                if last_seen is None:
-                    end_time = start_time_threshold.isoformat()
-                else:
-                    last_seen_dt = datetime.fromisoformat(last_seen)
-                    end_time = max(last_seen_dt, start_time_threshold).isoformat()
+    def log_changes(self, events, current_time):
+        """
+        Logs change feed events to the changelog table in the open transaction, numbered by the table.
+        """
+        self.conn.executemany('INSERT INTO changelog (time, op, id, fields) VALUES (?, ?, ?, ?)', (
+            (current_time.isoformat(), event['op'], event['id'], json.dumps(event['fields'], separators=(',', ':')))
+            for event in events))
 
-                # Update endTime to the latest value
-                cursor.execute('''
-                    UPDATE incidents
-                    SET endTime = ?
-                    WHERE id = ?
-                ''', (end_time, incident_id))
-                logger.debug(f"Marked incident {incident_id} as ended.")
+    def get_changelog(self, after=0):
+        """
+        Logged change events with seq greater than after, in order, as {"seq", "time", "op", "id", "fields"} dicts.
+        """
+        rows = self.conn.execute('SELECT seq, time, op, id, fields FROM changelog WHERE seq > ? ORDER BY seq', (after,))
+        return [{'seq': seq, 'time': time_, 'op': op, 'id': id_, 'fields': json.loads(fields)}
+                for seq, time_, op, id_, fields in rows]
+
+    def renumber_changelog(self, after):
+        """
+        Renumbers the logged events from after + 1, for a new database (or partition) numbering its events from 1.
+        """
+        cursor = self.conn.cursor()
+        first = cursor.execute('SELECT min(seq) FROM changelog').fetchone()[0]
+        if first is not None:
+            # Through negative values, shifting in place could collide with the next row
+            cursor.execute('UPDATE changelog SET seq = -seq')
+            cursor.execute('UPDATE changelog SET seq = ? - seq', (after + 1 - first,))
+        last = cursor.execute('SELECT max(seq) FROM changelog').fetchone()[0] or after
+        cursor.execute("UPDATE sqlite_sequence SET seq = ? WHERE name = 'changelog'", (last,))
+        if cursor.rowcount == 0:
+            cursor.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('changelog', ?)", (last,))
+        self.conn.commit()
+
+    def prune_changelog(self, up_to):
+        """
+        Deletes the logged events up to seq up_to, once they are in the feed.
+        """
+        self.conn.execute('DELETE FROM changelog WHERE seq <= ?', (up_to,))
+        self.conn.commit()
+
+    def partition_path(self, key):
+        root, ext = os.path.splitext(self.base_path)
+        return f"{root}_{key}{ext or '.db'}"
+
+    def load_manifest(self):
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                self.manifest = json.load(f)
+        else:
+            self.manifest = {'partition': self.partition, 'current': None, 'partitions': {}}
+
+    def save_manifest(self):
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def register_partition(self, key, path):
+        self.manifest['current'] = key
+        self.manifest['partitions'].setdefault(key, {'path': os.path.basename(path), 'closed': False})
+        self.save_manifest()
 
+    def carry_over_open_incidents(self, previous_path):
+        """
+        Moves open incidents from previous_path into the current partition so they keep being updated and ended.
+        """
+        cursor = self.conn.cursor()
+        self.conn.commit()
+        cursor.execute('ATTACH DATABASE ? AS previous', (previous_path,))
+        try:
+            existing = {row[0] for row in cursor.execute("SELECT name FROM previous.sqlite_master WHERE type = 'table'")}
+            open_ids = f'SELECT id FROM previous.incidents WHERE {OPEN_CONDITION}'
+            for table, id_column, _ in SIDE_TABLES.values():
+                if id_column and table in existing:
+                    cursor.execute(f'INSERT OR IGNORE INTO main.{table} SELECT * FROM previous.{table} WHERE {id_column} IN ({open_ids})')
+                    cursor.execute(f'DELETE FROM previous.{table} WHERE {id_column} IN ({open_ids})')
+            # Road ids are local to each file, the links of carried incidents are rebuilt from their road numbers
+            if 'incident_roads' in existing:
+                cursor.execute(f'DELETE FROM previous.incident_roads WHERE incident_id IN ({open_ids})')
+            cursor.execute(f'''
+                INSERT OR IGNORE INTO main.incidents SELECT * FROM previous.incidents WHERE {OPEN_CONDITION}
+            ''')
+            carried = cursor.execute(f'''
+                SELECT id, roadNumbers, startTime FROM main.incidents WHERE id IN ({open_ids})
+            ''').fetchall()
+            self.store_roads(carried)
+            cursor.execute(f'DELETE FROM previous.incidents WHERE {OPEN_CONDITION}')
+            moved = cursor.rowcount
+            # Change events not exported yet would be stranded in the closed partition
+            if 'changelog' in existing:
+                cursor.execute('INSERT INTO main.changelog SELECT * FROM previous.changelog')
+                cursor.execute('DELETE FROM previous.changelog')
             self.conn.commit()
-            logger.info(f"Marked {len(ended_incidents)} incident(s) as ended.")
-        except Exception as e:
-            logger.error(f"Error marking ended incidents: {e}", exc_info=True)
+        finally:
+            cursor.execute('DETACH DATABASE previous')
+        logger.info(f"Carried {moved} open incident(s) over from {previous_path}")
 
-    def export_to_geojson(self, start_datetime, end_datetime, output_file):
+    def close_partition(self, key, path):
+        """
+        Records the time bounds of a finished partition, compacts it once and makes the file read-only.
+        """
+        conn = sqlite3.connect(path)
         try:
-            cursor = self.conn.cursor()
-            cursor.execute('''
-                SELECT id, type, category, geometry_type, coordinates, magnitudeOfDelay, startTime,
-                       endTime, from_location, to_location, length, delay, roadNumbers,
-                       timeValidity, probabilityOfOccurrence, numberOfReports, lastReportTime,
-                       countryCode, tableNumber, tableVersion, direction
+            bounds = conn.execute(f'''
+                SELECT strftime('%Y-%m-%dT%H:%M:%S+00:00', MIN(julianday(startTime))),
+                       strftime('%Y-%m-%dT%H:%M:%S+00:00', MAX(julianday(startTime))),
+                       strftime('%Y-%m-%dT%H:%M:%S+00:00', MAX(julianday(coalesce(nullif(endTime, ''), last_seen))))
                 FROM incidents
-                WHERE (startTime BETWEEN ? AND ?) OR (endTime BETWEEN ? AND ?)
-            ''', (start_datetime, end_datetime, start_datetime, end_datetime))
-
-            rows = cursor.fetchall()
-            print(len(rows))
-            features = []
-            for row in rows:
-                (id_, type_, category, geometry_type, coordinates, magnitudeOfDelay, startTime,
-                 endTime, from_location, to_location, length, delay, roadNumbers,
-                 timeValidity, probabilityOfOccurrence, numberOfReports, lastReportTime,
-                 countryCode, tableNumber, tableVersion, direction) = row
-
-                # Convert coordinates from JSON string to list
-                try:
-                    coordinates = json.loads(coordinates)
-                except json.JSONDecodeError:
-                    logger.warning(f"Invalid coordinates for incident ID: {id_}")
-                    continue
+            ''').fetchone()
+            conn.execute('PRAGMA journal_mode = DELETE')
+            conn.execute('VACUUM')
+        finally:
+            conn.close()
+        os.chmod(path, stat.S_IREAD | stat.S_IRGRP | stat.S_IROTH)
 
-                # Define geometry
-                if geometry_type == 'Point':
-                    geometry = geojson.Point(coordinates)
-                elif geometry_type == 'LineString':
-                    geometry = geojson.LineString(coordinates)
-                else:
-                    logger.warning(f"Unsupported geometry type for incident ID: {id_}")
-                    continue
+        entry = self.manifest['partitions'].setdefault(key, {'path': os.path.basename(path)})
+        entry.update({'closed': True, 'min_start': bounds[0], 'max_start': bounds[1], 'max_end': bounds[2]})
+        self.save_manifest()
+        logger.info(f"Partition {path} closed, compacted and made read-only")
 
-                # Define properties
-                properties = {
-                    'id': id_,
-                    'type': type_,
-                    'category': category,
-                    'magnitudeOfDelay': magnitudeOfDelay,
-                    'startTime': startTime,
-                    'endTime': endTime,
-                    'from_location': from_location,
-                    'to_location': to_location,
-                    'length': length,
-                    'delay': delay,
-                    'roadNumbers': roadNumbers,
-                    'timeValidity': timeValidity,
-                    'probabilityOfOccurrence': probabilityOfOccurrence,
-                    'numberOfReports': numberOfReports,
-                    'lastReportTime': lastReportTime,
-                    'countryCode': countryCode,
-                    'tableNumber': tableNumber,
-                    'tableVersion': tableVersion,
-                    'direction': direction
-                }
-
-                feature = geojson.Feature(geometry=geometry, properties=properties)
-                features.append(feature)
+    def rollover(self, current_time):
+        """
+        Switches writes to a new partition once current_time enters a later period.
+        The first write of a connection picks the partition of current_time if the current one is still empty
+        (e.g. replaying old polls into a new database). Writes to an earlier period than the current partition
+        are rejected with a ValueError, closed partitions are read-only.
+        """
+        key = current_time.astimezone(UTC).strftime(PARTITION_FORMATS[self.partition])
+        if self.first_write:
+            self.first_write = False
+            if key != self.partition_key and self.rekey_empty_partition(key):
+                return
+        if key < self.partition_key:
+            raise ValueError(f"Cannot write {current_time.isoformat()} to partition {key}, "
+                             f"writes already moved on to partition {self.partition_key}")
+        if key == self.partition_key:
+            return
+        previous_key, previous_path = self.partition_key, self.db_path
+        self.conn.commit()
+        self.conn.close()
 
-            feature_collection = geojson.FeatureCollection(features)
-            with open(output_file, 'w') as f:
-                geojson.dump(feature_collection, f)
-            logger.info(f"Exported {len(features)} incidents to GeoJSON: {output_file}")
-        except Exception as e:
-            logger.error(f"Error exporting to GeoJSON: {e}", exc_info=True)
+        self.partition_key = key
+        self.db_path = self.partition_path(key)
+        self.conn = sqlite3.connect(self.db_path, uri=True)
+        self.initialize_db()
+        self.register_partition(key, self.db_path)
+        logger.info(f"Rolled over from partition {previous_key} to {key}")
 
-    def get_earliest_and_latest_start_times(self):
+        self.carry_over_open_incidents(previous_path)
+        self.close_partition(previous_key, previous_path)
+
+    def rekey_empty_partition(self, key):
         """
-        Get the earliest and latest start times from the incidents.
+        Replaces the current partition by the partition key if it holds no incidents and no closed partition is
+        more recent than key. Returns whether it did.
         """
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute('''
-                SELECT MIN(startTime), MAX(startTime) FROM incidents
-            ''')
-            result = cursor.fetchone()
-            earliest_start_time, latest_start_time = result
-            return earliest_start_time, latest_start_time
-        except Exception as e:
-            logger.error(f"Error getting earliest and latest start times from database: {e}", exc_info=True)
-            return None, None
-        
+        if self.conn.execute('SELECT 1 FROM incidents LIMIT 1').fetchone():
+            return False
+        closed = [k for k, entry in self.manifest['partitions'].items() if entry.get('closed') and k != 'unpartitioned']
+        if any(k >= key for k in closed):
+            return False
+        previous_key, previous_path = self.partition_key, self.db_path
+        self.conn.close()
+        for path in (previous_path, f"{previous_path}-wal", f"{previous_path}-shm"):
+            if os.path.exists(path):
+                os.remove(path)
+        self.manifest['partitions'].pop(previous_key, None)
+
+        self.partition_key = key
+        self.db_path = self.partition_path(key)
+        self.conn = sqlite3.connect(self.db_path, uri=True)
+        self.initialize_db()
+        self.register_partition(key, self.db_path)
+        logger.info(f"First write moved the empty partition {previous_key} to {key}")
+        return True
+
+    def adopt_unpartitioned(self):
+        """
+        Turns a pre-existing single-file database into a closed partition the first time partitioning is enabled.
+        """
+        key = 'unpartitioned'
+        if key in self.manifest['partitions'] or not os.path.exists(self.base_path):
+            return
+        self.carry_over_open_incidents(self.base_path)
+        self.close_partition(key, self.base_path)
+        self.manifest['current'] = self.partition_key
+        self.save_manifest()
+
     def optimize(self):
         try :
             cursor = self.conn.cursor()
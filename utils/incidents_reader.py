@@ -0,0 +1,74 @@
+import os
+import json
+import logging
+import sqlite3
+
+from .incidents_database import IncidentsQueries, readonly_uri
+
+# Define logger for module
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)  # Default logging level
+
+# If  logger has no handlers add console handler
+if not logger.hasHandlers():
+    console_handler = logging.StreamHandler()
+    formatter = logging.Formatter('%(asctime)s [%(levelname)s] %(filename)s - %(message)s')
+    console_handler.setFormatter(formatter)
+    logger.addHandler(console_handler)
+    logger.propagate = False
+
+
+class IncidentsReader(IncidentsQueries):
+    """
+    Read-only connection to the incidents database for reports and notebooks.
+
+    The database is opened with a mode=ro URI and query_only set, so it never creates tables, VACUUMs or takes
+    write locks. The writer runs in WAL mode, each query therefore reads a consistent snapshot without blocking
+    the poller, and any number of analysis processes can read at the same time.
+    Partitioned databases are detected from their manifest and queried across partitions.
+    """
+    def __init__(self, dir_path = None, db_path = None, location=None):
+        if dir_path:
+            self.dir_path = dir_path
+        elif db_path:
+            self.dir_path = os.path.dirname(db_path)
+        if not db_path :
+            self.db_path = os.path.join(self.dir_path, f"{location}_Incidents.db")
+        else :
+            self.db_path = db_path
+
+        self.manifest = {'partitions': {}}
+        root, _ = os.path.splitext(self.db_path)
+        manifest_path = f"{root}_partitions.json"
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                self.manifest = json.load(f)
+            current = self.manifest['partitions'][self.manifest['current']]
+            self.db_path = os.path.join(self.dir_path, current['path'])
+
+        self.conn = sqlite3.connect(readonly_uri(self.db_path), uri=True, isolation_level=None)
+        self.conn.execute('PRAGMA query_only = ON')
+        logger.info(f"Read-only connection to {self.db_path} database established")
+
+    def iter_query(self, query, params=(), start=None, end=None, batch_size=1000):
+        """
+        Streams the rows of query, which refers to the incidents table as {incidents}, across partitions.
+        """
+        return self.query_partitions(query, params, start=start, end=end, batch_size=batch_size)
+
+    def query_window(self, start_datetime, end_datetime, columns=('id', 'startTime', 'endTime', 'category', 'delay'),
+                     batch_size=1000):
+        """
+        Streams the given columns of the incidents starting or ending between start_datetime and end_datetime.
+        """
+        condition, params = self.window_condition(start_datetime, end_datetime, alias='')
+        query = f'''
+            SELECT {', '.join(columns)}
+            FROM {{incidents}}
+            WHERE {condition}
+        '''
+        return self.iter_query(query, params, start=start_datetime, end=end_datetime, batch_size=batch_size)
+
+    def close(self):
+        self.conn.close()
+        logger.info("Read-only database connection closed.")
@@ -0,0 +1,205 @@
+import gzip
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, UTC
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qsl
+
+from .incidents_database import to_datetime
+from .incidents_reader import IncidentsReader
+
+# Define logger for module
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)  # Default logging level
+
+# If  logger has no handlers add console handler
+if not logger.hasHandlers():
+    console_handler = logging.StreamHandler()
+    formatter = logging.Formatter('%(asctime)s [%(levelname)s] %(filename)s - %(message)s')
+    console_handler.setFormatter(formatter)
+    logger.addHandler(console_handler)
+    logger.propagate = False
+
+# Levels of detail kept in the live snapshot, see LOD_TOLERANCES
+LIVE_DETAILS = (0, 1, 2, 3)
+
+
+class CachedResponse:
+    """
+    Encoded response body with its gzip variant and ETag, computed once and shared by every client.
+    refreshed (the snapshot time) is sent as a header, so the ETag only changes when the data does.
+    """
+    def __init__(self, payload, refreshed=None, content_type='application/json'):
+        self.refreshed = refreshed
+        self.body = json.dumps(payload, separators=(',', ':')).encode()
+        self.gzipped = gzip.compress(self.body, compresslevel=6)
+        self.etag = f'"{hashlib.blake2b(self.body, digest_size=8).hexdigest()}"'
+        self.content_type = content_type
+
+
+class LiveAPIServer(ThreadingHTTPServer):
+    # Dashboards connect in bursts after each refresh, the default backlog of 5 drops connections
+    request_queue_size = 128
+    daemon_threads = True
+
+
+class LiveAPI:
+    """
+    Read-only HTTP API next to the poller, so dashboards never open the SQLite file themselves.
+
+    GET /incidents/live?detail=      open incidents (GeoJSON) from the in-memory snapshot
+    GET /incidents?start=&end=&detail=   incidents starting or ending in a window (GeoJSON)
+    GET /series?start=&end=&step_minutes=   incidents and delay per time bucket
+    GET /roads?start=&end=&road=     per-road incident count, delay and duration
+    GET /status                      snapshot size
+
+    The snapshot is rebuilt by refresh() after each poll. Responses are encoded and gzipped once, cached by path
+    and query until the next refresh, and carry an ETag so unchanged data costs clients a 304, also across
+    refreshes. The snapshot refresh time is sent in the X-Refreshed header rather than the body. Cache misses are
+    computed one at a time, window queries on their own read-only connection.
+    """
+    def __init__(self, dir_path=None, db_path=None, location=None, cache_size=256):
+        self.reader_kwargs = dict(dir_path=dir_path, db_path=db_path, location=location)
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+        self.compute_lock = threading.Lock()
+        self.version = 0
+        self.snapshot = {'refreshed': None, 'live': {detail: [] for detail in LIVE_DETAILS}}
+        self.server = None
+
+    def refresh(self, db):
+        """
+        Rebuilds the live snapshot from db (the poller's TrafficIncidentsDB or an IncidentsReader) and drops the
+        cached responses, which may all be stale after a poll.
+        """
+        snapshot = {
+            'refreshed': datetime.now(UTC).isoformat(),
+            'live': {detail: db.get_live_features(detail=detail) for detail in LIVE_DETAILS},
+        }
+        with self.lock:
+            self.snapshot = snapshot
+            self.version += 1
+            self.cache.clear()
+        logger.debug(f"Live API snapshot refreshed with {len(snapshot['live'][0])} open incident(s)")
+
+    def response(self, path, query):
+        """
+        Cached response of path and query, computing it on a miss. Raises KeyError for unknown paths and
+        ValueError for invalid parameters.
+        """
+        key = (path, tuple(sorted(query.items())))
+        with self.lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                return self.cache[key]
+        # Misses are computed one at a time, concurrent misses on the same key then find it cached
+        with self.compute_lock:
+            with self.lock:
+                if key in self.cache:
+                    return self.cache[key]
+                version = self.version
+                refreshed = self.snapshot['refreshed']
+            response = CachedResponse(self.compute(path, query), refreshed=refreshed)
+            with self.lock:
+                # A refresh during the computation makes the result stale for the next clients
+                if version == self.version:
+                    self.cache[key] = response
+                    if len(self.cache) > self.cache_size:
+                        self.cache.popitem(last=False)
+            return response
+
+    def compute(self, path, query):
+        detail = int(query.get('detail', 0))
+        if detail not in LIVE_DETAILS:
+            raise ValueError(f"detail must be one of {list(LIVE_DETAILS)}")
+        if path == '/status':
+            return {'live_incidents': len(self.snapshot['live'][0])}
+        if path == '/incidents/live':
+            return {'type': 'FeatureCollection', 'features': self.snapshot['live'][detail]}
+        if path not in ('/incidents', '/series', '/roads'):
+            raise KeyError(path)
+
+        end = to_datetime(query['end']) if query.get('end') else datetime.now(UTC)
+        start = to_datetime(query['start']) if query.get('start') else end - timedelta(days=1)
+        if start > end:
+            raise ValueError("start must be before end")
+        db = IncidentsReader(**self.reader_kwargs)
+        try:
+            if path == '/incidents':
+                condition, params = db.window_condition(start, end)
+                features = db.iter_features(condition, params, start=start, end=end, detail=detail)
+                return {'type': 'FeatureCollection', 'features': list(features)}
+            if path == '/series':
+                step = timedelta(minutes=int(query.get('step_minutes', 60)))
+                if step <= timedelta(0):
+                    raise ValueError("step_minutes must be positive")
+                return {'start': start.isoformat(), 'end': end.isoformat(), 'step_minutes': step.total_seconds() / 60,
+                        'series': db.get_series(start, end, step=step)}
+            roads = [road for road in query.get('road', '').split(',') if road]
+            return {'start': start.isoformat(), 'end': end.isoformat(), 'roads': db.road_stats(start, end, roads=roads)}
+        finally:
+            db.close()
+
+    def serve(self, port, host='127.0.0.1'):
+        """
+        Serves the API on http://host:port from background threads.
+        """
+        api = self
+
+        class LiveAPIHandler(BaseHTTPRequestHandler):
+            # Headers and body are separate writes, Nagle's algorithm would hold the body back for a delayed ACK
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                try:
+                    response = api.response(url.path.rstrip('/') or '/', dict(parse_qsl(url.query)))
+                except KeyError:
+                    self.send_error(404)
+                    return
+                except ValueError as e:
+                    self.send_error(400, str(e))
+                    return
+                except Exception:
+                    logger.error(f"Error serving {self.path}", exc_info=True)
+                    self.send_error(500)
+                    return
+
+                etags = {tag.strip().removeprefix('W/') for tag in self.headers.get('If-None-Match', '').split(',')}
+                if response.etag in etags or '*' in etags:
+                    self.send_response(304)
+                    self.send_header('ETag', response.etag)
+                    self.send_refreshed(response)
+                    self.end_headers()
+                    return
+
+                use_gzip = 'gzip' in self.headers.get('Accept-Encoding', '')
+                body = response.gzipped if use_gzip else response.body
+                self.send_response(200)
+                self.send_header('Content-Type', response.content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.send_header('ETag', response.etag)
+                self.send_refreshed(response)
+                self.send_header('Cache-Control', 'no-cache')
+                self.send_header('Vary', 'Accept-Encoding')
+                if use_gzip:
+                    self.send_header('Content-Encoding', 'gzip')
+                self.end_headers()
+                self.wfile.write(body)
+
+            def send_refreshed(self, response):
+                if response.refreshed:
+                    self.send_header('X-Refreshed', response.refreshed)
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        self.server = LiveAPIServer((host, port), LiveAPIHandler)
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        logger.info(f"Live API served on http://{host}:{self.server.server_address[1]}")
+        return self.server
@@ -0,0 +1,161 @@
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Define logger for module
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)  # Default logging level
+
+# If  logger has no handlers add console handler
+if not logger.hasHandlers():
+    console_handler = logging.StreamHandler()
+    formatter = logging.Formatter('%(asctime)s [%(levelname)s] %(filename)s - %(message)s')
+    console_handler.setFormatter(formatter)
+    logger.addHandler(console_handler)
+    logger.propagate = False
+
+# Histogram upper bounds in seconds, from fast single queries up to a full poll interval
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 60)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{value}"' for key, value in labels) + '}'
+
+
+class Metrics:
+    """
+    In-process registry of counters, gauges and histograms rendered in the Prometheus text format.
+    """
+    def __init__(self, prefix='tomtom', buckets=DEFAULT_BUCKETS):
+        self.prefix = prefix
+        self.buckets = tuple(sorted(buckets))
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self.help = {}
+        self.lock = threading.Lock()
+        self.server = None
+
+    def _key(self, name, labels):
+        return f"{self.prefix}_{name}", tuple(sorted(labels.items()))
+
+    def inc(self, name, value=1, help=None, **labels):
+        key = self._key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+            if help:
+                self.help[key[0]] = help
+
+    def set_gauge(self, name, value, help=None, **labels):
+        key = self._key(name, labels)
+        with self.lock:
+            self.gauges[key] = value
+            if help:
+                self.help[key[0]] = help
+
+    def observe(self, name, value, help=None, **labels):
+        key = self._key(name, labels)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram['buckets'][i] += 1
+            histogram['sum'] += value
+            histogram['count'] += 1
+            if help:
+                self.help[key[0]] = help
+
+    @contextmanager
+    def timer(self, stage):
+        """
+        Records the duration of the enclosed block in the stage duration histogram.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe('stage_duration_seconds', time.perf_counter() - start,
+                         help="Duration of each fetcher stage in seconds.", stage=stage)
+
+    def timed(self, stage, func):
+        """
+        Wraps func so every call is recorded under stage, for use with schedule jobs.
+        """
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with self.timer(stage):
+                return func(*args, **kwargs)
+        return wrapper
+
+    def record_db_size(self, db_path):
+        try:
+            size = os.path.getsize(db_path)
+            wal_path = f"{db_path}-wal"
+            if os.path.exists(wal_path):
+                size += os.path.getsize(wal_path)
+            self.set_gauge('db_size_bytes', size, help="Size of the SQLite database file in bytes.")
+        except OSError as e:
+            logger.warning(f"Could not read size of {db_path}: {e}")
+
+    def render(self):
+        lines = []
+        typed = set()
+
+        def header(name, kind):
+            if name in typed:
+                return
+            typed.add(name)
+            if name in self.help:
+                lines.append(f"# HELP {name} {self.help[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        with self.lock:
+            for (name, labels), value in sorted(self.counters.items()):
+                header(name, 'counter')
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+            for (name, labels), value in sorted(self.gauges.items()):
+                header(name, 'gauge')
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+            for (name, labels), histogram in sorted(self.histograms.items()):
+                header(name, 'histogram')
+                for bound, count in zip(self.buckets, histogram['buckets']):
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', bound),))} {count}")
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {histogram['count']}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {histogram['sum']}")
+                lines.append(f"{name}_count{_format_labels(labels)} {histogram['count']}")
+        return '\n'.join(lines) + '\n'
+
+    def serve(self, port, host='127.0.0.1'):
+        """
+        Exposes the registry on http://host:port/metrics from a background thread.
+        """
+        metrics = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        self.server = ThreadingHTTPServer((host, port), MetricsHandler)
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        logger.info(f"Metrics exposed on http://{host}:{port}/metrics")
+        return self.server
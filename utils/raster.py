@@ -0,0 +1,181 @@
+import os
+import json
+import logging
+from datetime import datetime, timedelta, UTC
+
+import numpy as np
+
+from .incidents_database import to_datetime
+from .hotspots import densify
+
+# Define logger for module
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)  # Default logging level
+
+# If  logger has no handlers add console handler
+if not logger.hasHandlers():
+    console_handler = logging.StreamHandler()
+    formatter = logging.Formatter('%(asctime)s [%(levelname)s] %(filename)s - %(message)s')
+    console_handler.setFormatter(formatter)
+    logger.addHandler(console_handler)
+    logger.propagate = False
+
+
+class DelayCube:
+    """
+    Append-only (time x rows x cols) float32 cube of incident delay burnt into a fixed lat/lon grid.
+
+    Frames are stored back to back in <path>.f32 and described by <path>.json (grid, first frame time, step,
+    number of frames). Frame i holds the summed weight of the incidents active at t0 + i * step in each cell,
+    row 0 being the southern edge. Reads are zero-copy slices of a read-only np.memmap.
+    """
+    def __init__(self, path, bbox=None, cell_size=0.002, t0=None, step=timedelta(minutes=10), weight='delay'):
+        self.path = path
+        self.data_path = f"{path}.f32"
+        self.meta_path = f"{path}.json"
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path) as f:
+                self.meta = json.load(f)
+            # Drop frames written after the last metadata update (interrupted append)
+            frame_bytes = self.meta['rows'] * self.meta['cols'] * 4
+            if os.path.exists(self.data_path) and os.path.getsize(self.data_path) > self.meta['frames'] * frame_bytes:
+                with open(self.data_path, 'r+b') as f:
+                    f.truncate(self.meta['frames'] * frame_bytes)
+        else:
+            if bbox is None or t0 is None:
+                raise ValueError(f"{self.meta_path} does not exist, bbox and t0 are needed to create the cube")
+            min_lon, min_lat, max_lon, max_lat = bbox
+            self.meta = {
+                'bbox': [min_lon, min_lat, max_lon, max_lat],
+                'cell_size': cell_size,
+                'cols': int(np.ceil((max_lon - min_lon) / cell_size)),
+                'rows': int(np.ceil((max_lat - min_lat) / cell_size)),
+                't0': to_datetime(t0).astimezone(UTC).isoformat(),
+                'step_seconds': int(step.total_seconds()),
+                'weight': weight,
+                'frames': 0,
+            }
+            open(self.data_path, 'ab').close()
+            self.save_meta()
+        self.t0 = to_datetime(self.meta['t0'])
+        self.step = timedelta(seconds=self.meta['step_seconds'])
+
+    def save_meta(self):
+        tmp_path = f"{self.meta_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.meta, f, indent=2)
+        os.replace(tmp_path, self.meta_path)
+
+    @property
+    def shape(self):
+        return self.meta['frames'], self.meta['rows'], self.meta['cols']
+
+    def frame_time(self, index):
+        return self.t0 + index * self.step
+
+    def frame_index(self, timestamp):
+        return int((to_datetime(timestamp) - self.t0) / self.step)
+
+    def cells(self, geometry_type, coordinates):
+        """
+        Flat indices of the grid cells covered by a Point or LineString.
+        """
+        min_lon, min_lat = self.meta['bbox'][:2]
+        cell_size, rows, cols = self.meta['cell_size'], self.meta['rows'], self.meta['cols']
+        points = densify([coordinates] if geometry_type == 'Point' else coordinates, cell_size / 2)
+        col = np.floor((points[:, 0] - min_lon) / cell_size).astype(np.int64)
+        row = np.floor((points[:, 1] - min_lat) / cell_size).astype(np.int64)
+        inside = (col >= 0) & (col < cols) & (row >= 0) & (row < rows)
+        return np.unique(row[inside] * cols + col[inside])
+
+    def append_until(self, db, until=None, chunk_frames=144):
+        """
+        Burns the frames from the end of the cube up to until (default: 5 minutes ago, so open incidents have
+        settled) from db, a TrafficIncidentsDB or an IncidentsReader, chunk_frames at a time.
+        Returns the number of frames appended.
+        """
+        until = to_datetime(until) if until else datetime.now(UTC) - timedelta(minutes=5)
+        appended = 0
+        while True:
+            count = min(self.frame_index(until) - self.meta['frames'] + 1, chunk_frames)
+            if count <= 0:
+                return appended
+            appended += self.append_frames(db, count)
+
+    def append_frames(self, db, count):
+        first = self.meta['frames']
+        last = first + count - 1
+        window_start, window_end = self.frame_time(first), self.frame_time(last)
+        rows, cols = self.meta['rows'], self.meta['cols']
+
+        # Incidents overlapping the new frames, an open incident lasts until it was last seen
+        query = f'''
+            SELECT geometry_type, coordinates, startTime, coalesce(nullif(endTime, ''), last_seen), {self.meta['weight']}
+            FROM {{incidents}}
+            WHERE julianday(startTime) <= julianday(?)
+              AND julianday(coalesce(nullif(endTime, ''), last_seen)) >= julianday(?)
+        '''
+        params = (window_end.isoformat(), window_start.isoformat())
+        frame_idx, cell_idx, weights = [], [], []
+        for geometry_type, coordinates, start_time, end_time, weight in db.query_partitions(
+                query, params, start=window_start, end=window_end):
+            if not weight:
+                continue
+            try:
+                cells = self.cells(geometry_type, json.loads(coordinates))
+            except (TypeError, ValueError):
+                continue
+            # Active on frames [begin, end) relative to the first new frame
+            begin = max(int(np.ceil((to_datetime(start_time) - window_start) / self.step)), 0)
+            end = min(int(np.floor((to_datetime(end_time) - window_start) / self.step)) + 1, count)
+            if begin >= end or not len(cells):
+                continue
+            frame_idx.extend([begin] * len(cells) + [end] * len(cells))
+            cell_idx.extend(np.concatenate([cells, cells]).tolist())
+            weights.extend([weight] * len(cells) + [-weight] * len(cells))
+
+        # Difference cube along time, its cumulative sum gives every frame in one pass
+        diff = np.zeros((count + 1, rows * cols), dtype=np.float64)
+        if weights:
+            np.add.at(diff, (np.asarray(frame_idx), np.asarray(cell_idx)), np.asarray(weights, dtype=np.float64))
+        frames = np.cumsum(diff[:count], axis=0).astype(np.float32).reshape(count, rows, cols)
+
+        with open(self.data_path, 'ab') as f:
+            f.write(frames.tobytes())
+        self.meta['frames'] += count
+        self.save_meta()
+        logger.info(f"Appended {count} frame(s) to {self.data_path} ({window_start.isoformat()} to {window_end.isoformat()})")
+        return count
+
+    def array(self):
+        """
+        Read-only memory map of the whole cube.
+        """
+        if not self.meta['frames']:
+            return np.zeros((0, self.meta['rows'], self.meta['cols']), dtype=np.float32)
+        return np.memmap(self.data_path, dtype=np.float32, mode='r', shape=self.shape)
+
+    def window(self, start=None, end=None, bbox=None):
+        """
+        Frames between start and end (inclusive) cropped to bbox, as a memory-mapped view.
+        """
+        cube = self.array()
+        first = max(self.frame_index(start), 0) if start else 0
+        last = self.frame_index(end) + 1 if end else cube.shape[0]
+        if bbox is None:
+            return cube[first:last]
+        min_lon, min_lat = self.meta['bbox'][:2]
+        cell_size = self.meta['cell_size']
+        col0 = max(int((bbox[0] - min_lon) // cell_size), 0)
+        row0 = max(int((bbox[1] - min_lat) // cell_size), 0)
+        col1 = int(np.ceil((bbox[2] - min_lon) / cell_size))
+        row1 = int(np.ceil((bbox[3] - min_lat) / cell_size))
+        return cube[first:last, row0:row1, col0:col1]
+
+    def extent(self):
+        """
+        (left, right, bottom, top) of the grid, for imshow(..., origin='lower', extent=...).
+        """
+        min_lon, min_lat = self.meta['bbox'][:2]
+        cell_size = self.meta['cell_size']
+        return min_lon, min_lon + self.meta['cols'] * cell_size, min_lat, min_lat + self.meta['rows'] * cell_size
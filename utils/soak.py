@@ -0,0 +1,150 @@
+import os
+import csv
+import time
+import logging
+import statistics
+import tracemalloc
+from datetime import timedelta
+
+# Define logger for module
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)  # Default logging level
+
+# If  logger has no handlers add console handler
+if not logger.hasHandlers():
+    console_handler = logging.StreamHandler()
+    formatter = logging.Formatter('%(asctime)s [%(levelname)s] %(filename)s - %(message)s')
+    console_handler.setFormatter(formatter)
+    logger.addHandler(console_handler)
+    logger.propagate = False
+
+SAMPLE_FIELDS = ['sim_time', 'sim_days', 'polls', 'traced_bytes', 'rss_bytes', 'latency_p50_ms', 'latency_p95_ms',
+                 'db_bytes']
+
+
+def linear_slope(xs, ys):
+    """
+    Least squares slope of ys against xs.
+    """
+    if len(xs) < 2:
+        return 0.0
+    mean_x, mean_y = statistics.fmean(xs), statistics.fmean(ys)
+    variance = sum((x - mean_x) ** 2 for x in xs)
+    if variance == 0:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / variance
+
+
+def rss_bytes():
+    """
+    Resident set size of the process, from /proc/self/statm where available (peak RSS elsewhere).
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def db_size(db_path):
+    size = 0
+    for path in (db_path, f"{db_path}-wal"):
+        if os.path.exists(path):
+            size += os.path.getsize(path)
+    return size
+
+
+def run_soak(poll, world, database, days=14, interval=40, sample_minutes=60, warmup_days=1,
+             max_memory_slope=1.0, max_latency_growth=0.02, output_dir=None, top=10, trace_memory=True):
+    """
+    Runs poll(current_time) every interval simulated seconds for days simulated days, advancing world (a
+    SimulatedIncidents) in between without sleeping, and checks that the poller does not drift.
+
+    Every sample_minutes of simulated time it records traced Python memory, RSS, the p50/p95 latency of the polls
+    since the previous sample and the database size. Linear fits over the samples after warmup_days (caches and
+    the incident population settle first) fail the run when memory grows faster than max_memory_slope MB per
+    simulated day, or the p50 latency faster than max_latency_growth times its post-warmup level per day.
+    The tracemalloc allocation sites that grew the most after the warmup are reported. Tracing slows allocation
+    heavy code (JSON decoding) several times, trace_memory=False leaves it off and only checks RSS.
+    Returns a report dict, its 'passed' key tells the outcome.
+    """
+    polls = int(days * 86400 // interval)
+    sample_every = max(int(sample_minutes * 60 // interval), 1)
+    warmup_end = world.now + timedelta(days=warmup_days)
+    start = world.now
+    samples, latencies, baseline = [], [], None
+
+    if trace_memory:
+        tracemalloc.start()
+    wall_start = time.perf_counter()
+    try:
+        for i in range(1, polls + 1):
+            world.advance(interval)
+            poll_start = time.perf_counter()
+            poll(world.now)
+            latencies.append((time.perf_counter() - poll_start) * 1000)
+
+            if trace_memory and baseline is None and world.now >= warmup_end:
+                baseline = tracemalloc.take_snapshot()
+            if i % sample_every == 0:
+                latencies.sort()
+                samples.append({
+                    'sim_time': world.now.isoformat(),
+                    'sim_days': (world.now - start).total_seconds() / 86400,
+                    'polls': i,
+                    'traced_bytes': tracemalloc.get_traced_memory()[0],
+                    'rss_bytes': rss_bytes(),
+                    'latency_p50_ms': latencies[len(latencies) // 2],
+                    'latency_p95_ms': latencies[int(len(latencies) * 0.95)],
+                    'db_bytes': db_size(database.db_path),
+                })
+                latencies = []
+                sample = samples[-1]
+                logger.info(f"Soak day {sample['sim_days']:.2f}: {sample['traced_bytes'] / 1e6:.1f} MB traced, "
+                            f"{sample['rss_bytes'] / 1e6:.1f} MB RSS, p50 {sample['latency_p50_ms']:.1f} ms, "
+                            f"DB {sample['db_bytes'] / 1e6:.1f} MB")
+        growth = []
+        if baseline is not None:
+            growth = tracemalloc.take_snapshot().compare_to(baseline, 'lineno')[:top]
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+
+    settled = [sample for sample in samples if sample['sim_days'] >= warmup_days]
+    x = [sample['sim_days'] for sample in settled]
+    traced_slope = linear_slope(x, [sample['traced_bytes'] / 1e6 for sample in settled])
+    rss_slope = linear_slope(x, [sample['rss_bytes'] / 1e6 for sample in settled])
+    latency_slope = linear_slope(x, [sample['latency_p50_ms'] for sample in settled])
+    latency_level = statistics.median(sample['latency_p50_ms'] for sample in settled) if settled else 0
+    latency_growth = latency_slope / latency_level if latency_level else 0.0
+
+    failures = []
+    if len(settled) < 2:
+        failures.append(f"only {len(settled)} sample(s) after the warmup, run for longer")
+    if traced_slope > max_memory_slope:
+        failures.append(f"traced memory grows {traced_slope:.2f} MB/day (max {max_memory_slope})")
+    if rss_slope > max_memory_slope:
+        failures.append(f"RSS grows {rss_slope:.2f} MB/day (max {max_memory_slope})")
+    if latency_growth > max_latency_growth:
+        failures.append(f"p50 poll latency grows {latency_growth:.1%}/day (max {max_latency_growth:.1%})")
+
+    report = {
+        'passed': not failures,
+        'failures': failures,
+        'polls': polls,
+        'wall_seconds': time.perf_counter() - wall_start,
+        'traced_slope_mb_per_day': traced_slope,
+        'rss_slope_mb_per_day': rss_slope,
+        'latency_p50_ms': latency_level,
+        'latency_growth_per_day': latency_growth,
+        'db_slope_mb_per_day': linear_slope(x, [sample['db_bytes'] / 1e6 for sample in settled]),
+        'top_growth': [str(stat) for stat in growth],
+        'samples': samples,
+    }
+    if output_dir:
+        with open(os.path.join(output_dir, 'soak.csv'), 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=SAMPLE_FIELDS)
+            writer.writeheader()
+            writer.writerows(samples)
+    return report